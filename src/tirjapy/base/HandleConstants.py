@@ -47,6 +47,44 @@ HTTP_READ_TIMEOUT        =    300                 # default http read timeout
 LONG_CONNECT_TIMEOUT     =    600                 # long http connect timeout
 LONG_READ_TIMEOUT        =    600                 # long http read timeout
 
+HTTP_FANOUT_WORKERS      =     16                 # max parallel requests in a batch
+HTTP_FANOUT_PER_HOST     =      4                 # max parallel requests per host in a batch
+HTTP_STREAM_CHUNK        = 1 << 20                # bytes per streamed body chunk
+
+HTTP_RETRIES             =      2                 # retries for idempotent requests
+HTTP_BACKOFF             =    0.2                 # backoff base secs, doubled per retry
+HTTP_BACKOFF_MAX         =     10                 # backoff cap secs
+HTTP_BREAKER_FAILS       =      5                 # failures in a row to open the circuit
+HTTP_BREAKER_RESET       =     30                 # secs before an open circuit is tried again
+HTTP_REDIRECTS           =      3                 # redirects followed
+
+HTTP_CACHE_SIZE          =   1024                 # cached GET responses
+HTTP_CACHE_TTL           =     60                 # secs fresh if no Cache-Control max-age
+
+HTTP_COMPRESS_MIN        =  16384                 # min request body bytes to compress
+
+HTTP_NUM_POOLS           =     10                 # hosts kept in the pool manager
+HTTP_POOL_MAXSIZE        =     10                 # kept connections per host
+HTTP_METRIC_ENDPOINTS    =   1000                 # endpoints tracked in http metrics
+
+# mysql
+
+MYSQL_FETCH_SIZE         =   1000                 # rows per fetchmany
+MYSQL_EXPORT_QUEUE       =      8                 # fetched batches buffered for export
+MYSQL_EXPORT_BLOCK       = 4 << 20                # bytes per export block write
+MYSQL_BULK_BATCH         =   1000                 # rows per multi-row insert
+MYSQL_BULK_WARNINGS      =     10                 # load data warnings logged
+MYSQL_PING_IDLE          =     60                 # ping session if idle for secs
+
+# s3
+
+S3_MAX_POOL              =     10                 # kept connections per s3 client
+S3_REPLICA_WORKERS       =      4                 # threads writing to the second bucket
+S3_REPLICA_QUEUE         =     64                 # second bucket writes queued before WriteFile waits
+S3_BATCH_WORKERS         =      8                 # parallel transfers in WriteMany / ReadMany
+S3_CACHE_QUOTA           = 10 << 30               # bytes held by the s3 disk cache
+S3_HASH_CHUNK            = 1 << 20                # bytes per read when hashing uploads
+
 # redis
 
 TASK_CANCEL_HSET         = 'nb_def_cancel'        # task cancel hset
@@ -35,7 +35,6 @@
 import os
 import sys
 import re
-import json
 import random
 import uuid
 import base64
@@ -45,6 +44,8 @@ from pathlib import Path
 from Crypto.Cipher import AES
 from Crypto.Util.Padding import pad, unpad
 
+from tirjapy.utils import JsonCodec
+
 class WebServiceBase():
 	"""Default Simple WebService base class."""
 
@@ -124,24 +125,22 @@ class WebServiceBase():
 		iv = ''.join(random.choices(string.ascii_lowercase + string.digits, k = BS))
 		# aes = AES.new(key, AES.MODE_CBC, bytes(iv,'utf8'))
 		aes = AES.new(usekey, AES.MODE_CBC, iv.encode('utf8'))
-		xdata = json.dumps(data)
-		pad = BS - len(xdata) % BS
-		xdata = xdata + pad * chr(pad)
-		encrypted = aes.encrypt(xdata.encode('utf8'))
+		## pad the utf-8 bytes, not the chars
+		encrypted = aes.encrypt(pad(JsonCodec.dumpb(data), BS))
 		return iv+base64.urlsafe_b64encode(encrypted).decode('utf8')
 
 	def _DecodeDict(self, skey, data):
-		output = ""
+		output = b""
 		try:
 			usekey=base64.b64decode(skey)
 			BS=AES.block_size
 			iv = data[:BS]
 			cipher = AES.new(usekey, AES.MODE_CBC, iv.encode('utf8') )
-			output = unpad(cipher.decrypt( base64.urlsafe_b64decode(data[BS:]) ), BS).decode('utf-8')
+			output = unpad(cipher.decrypt( base64.urlsafe_b64decode(data[BS:]) ), BS)
 		except:
-			output = "{}"
+			output = b"{}"
 
-		return json.loads(output)
+		return JsonCodec.loads(output)
 
 	def _PopulateBasicHeaderCreds(self, headers, username, passwd):
 		""" function to populate username password in headers """
@@ -172,11 +171,11 @@ class WebServiceBase():
 		headers['Content-Type'] = 'application/json'
 
 		output = { 'error' : True , 'status' : 'unknown' }
-		r = self.http.request( 'POST', url, headers=headers, body=json.dumps(data))
+		r = self.http.request( 'POST', url, headers=headers, body=JsonCodec.dumpb(data))
 		# print(r.status)
 
 		if r.status==200:
-			output = json.loads( r.data.decode('utf-8') )
+			output = JsonCodec.loads( r.data )
 		return output
 
 	def _PostFormData(self, creds, uri, fields):
@@ -194,7 +193,7 @@ class WebServiceBase():
 		r = self.http.request( 'POST', url, headers=headers, fields=fields, encode_multipart=True)
 
 		if r.status==200:
-			output = json.loads( r.data.decode('utf-8') )
+			output = JsonCodec.loads( r.data )
 		return output
 
 	def _GetJsonData(self, creds, uri, fields={}):
@@ -211,6 +210,6 @@ class WebServiceBase():
 		r = self.http.request( 'GET', url, headers=headers, fields=fields)
 
 		if r.status==200:
-			output = json.loads( r.data.decode('utf-8') )
+			output = JsonCodec.loads( r.data )
 		return output
 
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+#
+# @project TirjaPy
+# @file src/tirjapy/utils/CircuitBreaker.py
+# @author  Shreos Roychowdhury <shreos@tirja.com>
+# @version 1.0.0
+# 
+# @section DESCRIPTION
+# 
+#   CircuitBreaker.py : per host circuit breaker
+# 
+# @section LICENSE
+# 
+# Copyright (c) 2025 Shreos Roychowdhury.
+# Copyright (c) 2025 Tirja Consulting LLP.
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+# 
+
+import time
+import threading
+import urllib3
+
+class CircuitOpenError(urllib3.exceptions.HTTPError):
+	""" raised instead of calling a host whose circuit is open """
+	pass
+
+class CircuitBreaker:
+	""" opens after `fails` failures in a row, lets one trial through after `reset` secs """
+
+	def __init__(self, fails, reset):
+		""" fails of 0 disables the breaker """
+		self.fails = fails
+		self.reset = reset
+		self.lock = threading.Lock()
+		self.count = 0
+		self.opened = 0.0
+		self.probing = False
+
+	def Allow(self):
+		""" check if a call may go through """
+		if self.fails <= 0:
+			return True
+		with self.lock:
+			if not self.opened:
+				return True
+			if self.probing or time.monotonic() - self.opened < self.reset:
+				return False
+			## half open, a single trial call
+			self.probing = True
+			return True
+
+	def Success(self):
+		""" record a healthy call """
+		with self.lock:
+			self.count = 0
+			self.opened = 0.0
+			self.probing = False
+
+	def Failure(self):
+		""" record a failed call """
+		with self.lock:
+			self.count += 1
+			if self.probing or (self.fails > 0 and self.count >= self.fails):
+				self.opened = time.monotonic()
+				self.probing = False
+
+	def GetState(self):
+		""" closed, open or half-open """
+		with self.lock:
+			if not self.opened:
+				return 'closed'
+			return 'half-open' if self.probing else 'open'
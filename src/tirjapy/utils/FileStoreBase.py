@@ -33,6 +33,7 @@
 # 
 
 import os
+import io
 import json
 import math
 import time
@@ -66,6 +67,28 @@ class ModelPath(HandleQuotes):
 			'upload_folder' : self.upload_folder,
 		}
 
+class _RangeReader(io.RawIOBase):
+	""" raw reader of the next length bytes of an open binary file, closes it on close """
+
+	def __init__(self, fobj, length):
+		self.fobj = fobj
+		self.left = length
+
+	def readable(self):
+		return True
+
+	def readinto(self, buf):
+		if self.left <= 0:
+			return 0
+		count = self.fobj.readinto(memoryview(buf)[:self.left])
+		self.left -= count
+		return count
+
+	def close(self):
+		if not self.closed:
+			self.fobj.close()
+		super().close()
+
 class FileStoreBase(StoreBase):
 
 	def __init__(self):
@@ -107,18 +130,50 @@ class FileStoreBase(StoreBase):
 			raise ValueError(f"File exists at {self.local_path}")
 		dirname = os.path.dirname(self.local_path)
 		os.makedirs(dirname,exist_ok = True)
+		## a fetched file may be a hardlink into the s3 disk cache, write a new one
+		if os.path.isfile(self.local_path):
+			os.unlink(self.local_path)
 		file_obj.seek(0)
 		file_obj.save(self.local_path)
 
-	def WriteToS3(self, overwrite=False):
-		""" Writes to S3"""
+	def WriteToS3(self, overwrite=False, skip_same=None):
+		""" Writes to S3, skip_same skips content already in S3, default as registered"""
 		if self.fetched and (not overwrite):
 			return None
 		shandle = StorageHandle()
-		shandle.WriteFileObj(self)
+		shandle.WriteFileObj(self, skip_same=skip_same)
 		self.sync_type=SyncTypes.WRITTEN
 		self.fetched=True
 		
+	def WriteStreamToS3(self, file_obj, overwrite=False):
+		""" Writes an upload or file like object to S3 directly, no local file, not replicated as WriteToS3"""
+		if self.fetched and (not overwrite):
+			return None
+		## uploads carry their stream, others are streams
+		stream = getattr(file_obj, 'stream', file_obj)
+		if hasattr(stream, 'seek'):
+			stream.seek(0)
+		shandle = StorageHandle()
+		shandle.WriteStream(stream, self.s3_path, bucket=self.s3_bucket)
+		self.sync_type=SyncTypes.WRITTEN
+		self.fetched=True
+
+	def OpenStream(self, start=0, end=None):
+		""" Local file if present, else S3 streaming body, bytes start to end inclusive"""
+		if os.path.isfile(self.local_path):
+			fobj = open(self.local_path, 'rb')
+			try:
+				fobj.seek(start)
+			except:
+				fobj.close()
+				raise
+			if end is None:
+				return fobj
+			## reads stop at end, the range is not loaded in memory
+			return io.BufferedReader(_RangeReader(fobj, max(0, end - start + 1)))
+		shandle = StorageHandle()
+		return shandle.ReadStream(self.s3_bucket, self.s3_path, start, end)
+
 	def _FetchFromS3(self , overwrite=False):
 		""" Reads from S3"""
 		if (not overwrite) and os.path.isfile(self.local_path):
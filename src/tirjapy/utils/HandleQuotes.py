@@ -37,10 +37,11 @@ import sys
 import re
 from pathlib import Path
 import html
-import json
 from datetime import datetime, timezone
 from base64 import b64encode, b64decode
 
+from tirjapy.utils import JsonCodec
+
 class HandleQuotes:
 
 	def __init__(self):
@@ -65,7 +66,7 @@ class HandleQuotes:
 
 	def _SanitJsonQ(self, data):
 		""" add single quotes and protect json"""
-		return "'" + json.dumps(data).replace("'","\\'") + "'"
+		return "'" + JsonCodec.dumps(data).replace("'","\\'") + "'"
 
 	def _SanitTagQ(self, data):
 		""" sanit tags to csv fx private"""
@@ -271,9 +272,9 @@ class HandleQuotes:
 
 	def _JsonToBase64(self, data):
 		""" convert json to base 64"""
-		return b64encode(json.dumps(data).encode('utf-8')).decode('latin-1')
+		return b64encode(JsonCodec.dumpb(data)).decode('latin-1')
 
 	def _Base64ToJson(self, data):
 		""" convert object base 64 to json """
-		return json.loads( b64decode(data) )
+		return JsonCodec.loads( b64decode(data) )
 
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+#
+# @project TirjaPy
+# @file src/tirjapy/utils/HttpMetrics.py
+# @author  Shreos Roychowdhury <shreos@tirja.com>
+# @version 1.0.0
+# 
+# @section DESCRIPTION
+# 
+#   HttpMetrics.py : http latency histograms, counters and hooks
+# 
+# @section LICENSE
+# 
+# Copyright (c) 2025 Shreos Roychowdhury.
+# Copyright (c) 2025 Tirja Consulting LLP.
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+# 
+
+from loguru import logger
+
+import time
+import threading
+import urllib3
+
+from tirjapy.base.HandleConstants import HTTP_METRIC_ENDPOINTS
+
+## latency bucket upper bounds in ms, last one catches the rest
+LATENCY_BUCKETS = [ 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, float('inf') ]
+
+## connect time of the calling thread, set by the timed connections
+_local = threading.local()
+
+def _timed_connect(connect):
+	""" time a connect, tcp and tls """
+	start = time.perf_counter()
+	try:
+		connect()
+	finally:
+		_local.connect = getattr(_local, 'connect', 0.0) + time.perf_counter() - start
+
+def reset_connect_time():
+	""" start counting connect time for this thread """
+	_local.connect = 0.0
+
+def connect_time():
+	""" connect secs since reset_connect_time on this thread """
+	return getattr(_local, 'connect', 0.0)
+
+class TimedHTTPConnection(urllib3.connection.HTTPConnection):
+	""" http connection recording connect time """
+
+	def connect(self):
+		_timed_connect(super().connect)
+
+class TimedHTTPSConnection(urllib3.connection.HTTPSConnection):
+	""" https connection recording connect time """
+
+	def connect(self):
+		_timed_connect(super().connect)
+
+class TimedHTTPConnectionPool(urllib3.HTTPConnectionPool):
+	ConnectionCls = TimedHTTPConnection
+
+class TimedHTTPSConnectionPool(urllib3.HTTPSConnectionPool):
+	ConnectionCls = TimedHTTPSConnection
+
+TIMED_POOL_CLASSES = { 'http' : TimedHTTPConnectionPool, 'https' : TimedHTTPSConnectionPool }
+
+class HttpMetrics:
+	""" per host and per endpoint request stats, with before / after hooks
+
+	request info passed to hooks and Record has method, url, host, endpoint,
+	attempt and after the call status, error, bytes_sent, bytes_recv and
+	connect, ttfb, body, total in secs
+	"""
+
+	def __init__(self, max_endpoints=HTTP_METRIC_ENDPOINTS):
+		""" endpoints past max_endpoints are counted under `other` """
+		self.max_endpoints = max_endpoints
+		self.lock = threading.Lock()
+		self.hooks = []
+		self.hosts = {}
+		self.endpoints = {}
+
+	def AddHook(self, before=None, after=None):
+		""" add callbacks, before(info) and after(info) """
+		with self.lock:
+			self.hooks = self.hooks + [(before, after)]
+
+	def ClearHooks(self):
+		""" remove all callbacks """
+		with self.lock:
+			self.hooks = []
+
+	def Before(self, info):
+		""" run before hooks, errors are logged """
+		for before, after in self.hooks:
+			if before:
+				try:
+					before(info)
+				except Exception as err:
+					logger.warning("Http hook error: {}", err)
+
+	def After(self, info):
+		""" record and run after hooks, errors are logged """
+		self.Record(info)
+		for before, after in self.hooks:
+			if after:
+				try:
+					after(info)
+				except Exception as err:
+					logger.warning("Http hook error: {}", err)
+
+	def _NewStat(self):
+		""" blank stat entry """
+		return {
+			'requests' : 0,
+			'errors' : 0,
+			'status' : {},
+			'bytes_sent' : 0,
+			'bytes_recv' : 0,
+			'connect' : 0.0,
+			'ttfb' : 0.0,
+			'body' : 0.0,
+			'total' : 0.0,
+			'max' : 0.0,
+			'buckets' : [0] * len(LATENCY_BUCKETS),
+		}
+
+	def _Update(self, stat, info):
+		""" add one request to a stat entry """
+		stat['requests'] += 1
+		if info.get('error'):
+			stat['errors'] += 1
+		else:
+			status = info.get('status')
+			stat['status'][status] = stat['status'].get(status, 0) + 1
+		stat['bytes_sent'] += info.get('bytes_sent', 0)
+		stat['bytes_recv'] += info.get('bytes_recv', 0)
+		for name in ['connect', 'ttfb', 'body', 'total']:
+			stat[name] += info.get(name) or 0.0
+		total = info.get('total') or 0.0
+		stat['max'] = max(stat['max'], total)
+		msecs = total * 1000
+		for pos, bound in enumerate(LATENCY_BUCKETS):
+			if msecs <= bound:
+				stat['buckets'][pos] += 1
+				break
+
+	def Record(self, info):
+		""" add one finished request """
+		with self.lock:
+			host = info['host']
+			if host not in self.hosts:
+				self.hosts[host] = self._NewStat()
+			self._Update(self.hosts[host], info)
+			endpoint = info['endpoint']
+			if endpoint not in self.endpoints and len(self.endpoints) >= self.max_endpoints:
+				endpoint = 'other'
+			if endpoint not in self.endpoints:
+				self.endpoints[endpoint] = self._NewStat()
+			self._Update(self.endpoints[endpoint], info)
+
+	def _Copy(self, stat):
+		""" copy of a stat entry with bucket bounds """
+		out = dict(stat)
+		out['status'] = dict(stat['status'])
+		out['buckets'] = dict(zip([str(b) for b in LATENCY_BUCKETS], stat['buckets']))
+		return out
+
+	def GetStats(self):
+		""" stats per host and per endpoint, times in secs, buckets in ms """
+		with self.lock:
+			return {
+				'hosts' : { k : self._Copy(v) for k, v in self.hosts.items() },
+				'endpoints' : { k : self._Copy(v) for k, v in self.endpoints.items() },
+			}
+
+	def Reset(self):
+		""" clear stats, keep hooks """
+		with self.lock:
+			self.hosts = {}
+			self.endpoints = {}
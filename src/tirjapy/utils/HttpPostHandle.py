@@ -37,17 +37,80 @@ from loguru import logger
 import os
 import sys
 import re
-import json
+import gzip
+import time
+import random
+import socket
+import hashlib
+import threading
 import urllib3
 from base64 import b64encode
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
+try:
+	import zstandard
+except ImportError:
+	zstandard = None
+
+from tirjapy.utils import JsonCodec
+from tirjapy.utils import JsonStream
 from tirjapy.utils.HandleQuotes import HandleQuotes
+from tirjapy.utils.MultipartStream import MultipartStream
+from tirjapy.utils.CircuitBreaker import CircuitBreaker, CircuitOpenError
+from tirjapy.utils.LruCache import LruCache
+from tirjapy.utils.SingleFlight import SingleFlight
+from tirjapy.utils import HttpMetrics
 from tirjapy.base.HandleConstants import \
-	HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, LONG_CONNECT_TIMEOUT, LONG_READ_TIMEOUT
+	HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, LONG_CONNECT_TIMEOUT, LONG_READ_TIMEOUT, \
+	HTTP_FANOUT_WORKERS, HTTP_FANOUT_PER_HOST, \
+	HTTP_RETRIES, HTTP_BACKOFF, HTTP_BACKOFF_MAX, HTTP_BREAKER_FAILS, HTTP_BREAKER_RESET, HTTP_REDIRECTS, \
+	HTTP_CACHE_SIZE, HTTP_CACHE_TTL, HTTP_COMPRESS_MIN, HTTP_NUM_POOLS, HTTP_POOL_MAXSIZE
+
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS'])
+RETRY_STATUS = frozenset([429, 502, 503, 504])
+
+## retries are done in _Request, urllib3 only follows redirects ; total=False would also turn redirects off
+NO_RETRY = urllib3.util.Retry(total=None, connect=0, read=0, status=0, other=0, redirect=HTTP_REDIRECTS,
+	raise_on_redirect=False)
+
+## encodings urllib3 can decode here, zstd / br only if their modules are installed
+ACCEPT_ENCODING = urllib3.util.make_headers(accept_encoding=True)['accept-encoding']
+
+HTTP_DEFAULT_CONF = {
+	'retries' : HTTP_RETRIES,
+	'retry_read' : False,
+	'backoff' : HTTP_BACKOFF,
+	'backoff_max' : HTTP_BACKOFF_MAX,
+	'breaker_fails' : HTTP_BREAKER_FAILS,
+	'breaker_reset' : HTTP_BREAKER_RESET,
+	'connect_timeout' : LONG_CONNECT_TIMEOUT,
+	'read_timeout' : LONG_READ_TIMEOUT,
+	'maxsize' : HTTP_POOL_MAXSIZE,
+	'block' : False,
+	'num_pools' : HTTP_NUM_POOLS,
+	'keepalive' : False,
+	'hosts' : {},
+	'cache_size' : HTTP_CACHE_SIZE,
+	'cache_ttl' : HTTP_CACHE_TTL,
+	'coalesce' : False,
+	'compress' : '',
+	'compress_min' : HTTP_COMPRESS_MIN,
+	'accept_encoding' : True,
+}
 
 class HttpPostHandle(HandleQuotes):
 
 	my_http_pool_manager = None
+	my_host_pools = {}
+	my_http_conf = None
+	my_host_breakers = {}
+	my_breaker_lock = threading.Lock()
+	my_http_cache = None
+	my_http_flights = SingleFlight()
+	my_http_metrics = HttpMetrics.HttpMetrics()
+	## statuses retried here, subclasses that pace 429 themselves drop it
+	my_retry_status = RETRY_STATUS
 
 	def __init__(self):
 		""" constructor default"""
@@ -58,9 +121,167 @@ class HttpPostHandle(HandleQuotes):
 		""" Init fx"""
 		if HttpPostHandle.my_http_pool_manager:
 			return None
-		timeout = urllib3.util.Timeout(connect=LONG_CONNECT_TIMEOUT, read=LONG_READ_TIMEOUT)
-		pool_manager = urllib3.PoolManager(timeout=timeout)
-		HttpPostHandle.my_http_pool_manager = pool_manager
+		conf = self._GlobalConf()
+		HttpPostHandle.my_http_pool_manager = self._MakePoolManager(conf, conf)
+
+	def _MakePoolManager(self, conf, hconf):
+		""" pool manager with pool size and blocking from hconf """
+		## keep the default TCP_NODELAY, None would drop it and stall bodies sent after headers
+		socket_options = urllib3.connection.HTTPConnection.default_socket_options
+		if conf['keepalive']:
+			socket_options = socket_options + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+		timeout = urllib3.util.Timeout(connect=hconf['connect_timeout'], read=hconf['read_timeout'])
+		pool_manager = urllib3.PoolManager(num_pools=conf['num_pools'], maxsize=hconf['maxsize'], block=hconf['block'],
+			timeout=timeout, retries=NO_RETRY, socket_options=socket_options)
+		## connections that record connect time for metrics
+		pool_manager.pool_classes_by_scheme = HttpMetrics.TIMED_POOL_CLASSES
+		return pool_manager
+
+	def _PoolFor(self, host, netloc):
+		""" own pool manager for hosts with their own pool size """
+		pools = HttpPostHandle.my_host_pools
+		if pools:
+			pool_manager = pools.get(netloc, pools.get(host))
+			if pool_manager:
+				return pool_manager
+		## shared manager, self.http may predate a later RegisterGlobals
+		return HttpPostHandle.my_http_pool_manager
+
+	def GetPoolStats(self):
+		""" connection pool use per host """
+		managers = [HttpPostHandle.my_http_pool_manager] + list(HttpPostHandle.my_host_pools.values())
+		stats = []
+		for pool_manager in managers:
+			if not pool_manager:
+				continue
+			for key in list(pool_manager.pools.keys()):
+				pool = pool_manager.pools.get(key)
+				if not pool:
+					continue
+				## queue holds idle connections and None for free slots
+				queue = list(pool.pool.queue) if pool.pool else []
+				stats.append({
+					'host' : pool.host,
+					'port' : pool.port,
+					'scheme' : pool.scheme,
+					'maxsize' : pool.pool.maxsize if pool.pool else 0,
+					'idle' : sum(1 for conn in queue if conn is not None),
+					'in_use' : (pool.pool.maxsize - len(queue)) if pool.pool else 0,
+					'opened' : pool.num_connections,
+					'requests' : pool.num_requests,
+				})
+		return stats
+
+	def _HostSettings(self, params):
+		""" retry, breaker and timeout settings from params """
+		return {
+			'retries' : self._OptionalInteger(params, 'retries', HTTP_RETRIES),
+			'retry_read' : self._OptionalBool(params, 'retry_read', False),
+			'backoff' : self._OptionalFloat(params, 'backoff', HTTP_BACKOFF),
+			'backoff_max' : self._OptionalFloat(params, 'backoff_max', HTTP_BACKOFF_MAX),
+			'breaker_fails' : self._OptionalInteger(params, 'breaker_fails', HTTP_BREAKER_FAILS),
+			'breaker_reset' : self._OptionalFloat(params, 'breaker_reset', HTTP_BREAKER_RESET),
+			'connect_timeout' : self._OptionalFloat(params, 'connect_timeout', LONG_CONNECT_TIMEOUT),
+			'read_timeout' : self._OptionalFloat(params, 'read_timeout', LONG_READ_TIMEOUT),
+			'maxsize' : self._OptionalInteger(params, 'maxsize', HTTP_POOL_MAXSIZE),
+			'block' : self._OptionalBool(params, 'block', False),
+		}
+
+	def RegisterGlobals(self, params):
+		"""Register Global fx, `hosts` maps host or host:port to overrides of the same settings
+
+		pool settings are `maxsize` connections kept per host, `block` to wait for a
+		free connection instead of opening extra ones, `num_pools` and `keepalive`
+
+		`retry_read` also retries idempotent calls after a read timeout, off by default
+		as each attempt may wait the full read timeout
+		"""
+
+		conf = self._HostSettings(params)
+		conf['hosts'] = {}
+		for host, hparams in self._OptionalObject(params, 'hosts', {}).items():
+			conf['hosts'][host] = self._HostSettings({ **params, **hparams })
+		conf['cache_size'] = self._OptionalInteger(params, 'cache_size', HTTP_CACHE_SIZE)
+		conf['cache_ttl'] = self._OptionalFloat(params, 'cache_ttl', HTTP_CACHE_TTL)
+		conf['coalesce'] = self._OptionalBool(params, 'coalesce', False)
+		conf['compress'] = self._OptionalField(params, 'compress', '')
+		conf['compress_min'] = self._OptionalInteger(params, 'compress_min', HTTP_COMPRESS_MIN)
+		conf['accept_encoding'] = self._OptionalBool(params, 'accept_encoding', True)
+		conf['num_pools'] = self._OptionalInteger(params, 'num_pools', HTTP_NUM_POOLS)
+		conf['keepalive'] = self._OptionalBool(params, 'keepalive', False)
+		if conf['compress'] not in ['', 'gzip', 'zstd']:
+			raise ValueError("Unknown compress: " + conf['compress'])
+		if conf['compress'] == 'zstd' and not zstandard:
+			raise ValueError("zstd compress needs zstandard installed")
+		HttpPostHandle.my_http_conf = conf
+		with HttpPostHandle.my_breaker_lock:
+			HttpPostHandle.my_host_breakers = {}
+			HttpPostHandle.my_http_cache = None
+
+		## pools, hosts with a different size or blocking get their own manager
+		HttpPostHandle.my_http_pool_manager = self._MakePoolManager(conf, conf)
+		host_pools = {}
+		for host, hconf in conf['hosts'].items():
+			if hconf['maxsize'] != conf['maxsize'] or hconf['block'] != conf['block']:
+				host_pools[host] = self._MakePoolManager(conf, hconf)
+		HttpPostHandle.my_host_pools = host_pools
+		self.http = HttpPostHandle.my_http_pool_manager
+
+	def _GlobalConf(self):
+		""" registered settings else defaults """
+		return HttpPostHandle.my_http_conf if HttpPostHandle.my_http_conf else HTTP_DEFAULT_CONF
+
+	def _HostConf(self, host, netloc):
+		""" settings for host:port else host """
+		conf = self._GlobalConf()
+		if netloc in conf['hosts']:
+			return conf['hosts'][netloc]
+		return conf['hosts'].get(host, conf)
+
+	def _GetBreaker(self, host, conf):
+		""" shared breaker for host """
+		breaker = HttpPostHandle.my_host_breakers.get(host)
+		if breaker:
+			return breaker
+		with HttpPostHandle.my_breaker_lock:
+			if host not in HttpPostHandle.my_host_breakers:
+				HttpPostHandle.my_host_breakers[host] = CircuitBreaker(conf['breaker_fails'], conf['breaker_reset'])
+			return HttpPostHandle.my_host_breakers[host]
+
+	def GetBreakerStates(self):
+		""" circuit state per host """
+		with HttpPostHandle.my_breaker_lock:
+			breakers = dict(HttpPostHandle.my_host_breakers)
+		return { host : breaker.GetState() for host, breaker in breakers.items() }
+
+	def _MakeTimeout(self, timeout, conf):
+		""" per call timeout : Timeout, secs, or (connect, read) """
+		if timeout is None:
+			return urllib3.util.Timeout(connect=conf['connect_timeout'], read=conf['read_timeout'])
+		if isinstance(timeout, urllib3.util.Timeout):
+			return timeout
+		if isinstance(timeout, (tuple, list)):
+			return urllib3.util.Timeout(connect=timeout[0], read=timeout[1])
+		return urllib3.util.Timeout(connect=timeout, read=timeout)
+
+	def _RetryAfter(self, r):
+		""" Retry-After secs of a response, 0 if none or bad """
+		value = r.headers.get('Retry-After')
+		if not value:
+			return 0
+		try:
+			return NO_RETRY.parse_retry_after(value)
+		except urllib3.exceptions.InvalidHeader:
+			return 0
+
+	def _Retryable(self, idempotent, err, conf):
+		""" connect failures never reached the server, safe for any method, read timeouts only if retry_read """
+		reason = err.reason if isinstance(err, urllib3.exceptions.MaxRetryError) else err
+		if isinstance(reason, (urllib3.exceptions.NewConnectionError, urllib3.exceptions.ConnectTimeoutError)):
+			return True
+		if isinstance(reason, urllib3.exceptions.ReadTimeoutError):
+			return idempotent and conf['retry_read']
+		return idempotent
 
 	def _PopulateBasicHeaderCreds(self, headers, username, passwd):
 		""" function to load username password in headers """
@@ -69,59 +290,368 @@ class HttpPostHandle(HandleQuotes):
 			base64creds = b64encode(use_creds.encode('ascii'))
 			headers['Authorization'] = "Basic {}".format(base64creds.decode('ascii'))
 
-	def PostFile(self, filename, url, username, passwd):
-		""" post file as form file """
+	def AddHook(self, before=None, after=None):
+		""" add request callbacks before(info) and after(info), see HttpMetrics """
+		HttpPostHandle.my_http_metrics.AddHook(before, after)
+
+	def GetMetrics(self):
+		""" latency, status and bytes per host and endpoint """
+		return HttpPostHandle.my_http_metrics.GetStats()
+
+	def ResetMetrics(self):
+		""" clear metrics """
+		HttpPostHandle.my_http_metrics.Reset()
+
+	def _BodySize(self, body):
+		""" bytes in a request body """
+		if body is None:
+			return 0
+		if isinstance(body, (bytes, str)):
+			return len(body)
+		return getattr(body, 'length', 0)
+
+	def _TimedRequest(self, pool_manager, method, url, headers, info, kwargs):
+		""" one attempt, timed as connect, first byte and body, with hooks """
+
+		metrics = HttpPostHandle.my_http_metrics
+		preload = kwargs.get('preload_content', True)
+		info['bytes_sent'] = self._BodySize(kwargs.get('body'))
+		metrics.Before(info)
+		HttpMetrics.reset_connect_time()
+		start = time.perf_counter()
+		try:
+			r = pool_manager.request( method, url, headers=headers, **{ **kwargs, 'preload_content' : False })
+			info['ttfb'] = time.perf_counter() - start
+			info['status'] = r.status
+			## streamed bodies are read by the caller, not timed here
+			if preload:
+				r.read(cache_content=True)
+				info['body'] = time.perf_counter() - start - info['ttfb']
+				info['bytes_recv'] = r.tell()
+		except Exception as err:
+			info['error'] = str(err)
+			raise
+		finally:
+			info['total'] = time.perf_counter() - start
+			info['connect'] = HttpMetrics.connect_time()
+			if 'ttfb' in info:
+				info['ttfb'] = max(0.0, info['ttfb'] - info['connect'])
+			metrics.After(info)
+		return r
+
+	def _Request(self, method, url, headers, timeout=None, **kwargs):
+		""" single request path for all calls, with retries, circuit breaker and metrics """
+
+		purl = urllib3.util.parse_url(url)
+		host = purl.netloc
+		conf = self._HostConf(purl.host, host)
+		breaker = self._GetBreaker(host, conf)
+		pool_manager = self._PoolFor(purl.host, host)
+		endpoint = host + (purl.path if purl.path else '/')
+		kwargs['timeout'] = self._MakeTimeout(timeout, conf)
+		## compressed responses are decoded by urllib3, also when streamed
+		if 'Accept-Encoding' not in headers and self._GlobalConf()['accept_encoding']:
+			headers['Accept-Encoding'] = ACCEPT_ENCODING
+		idempotent = method in IDEMPOTENT_METHODS
+
+		## one breaker check and one outcome per call, retries are not counted
+		if not breaker.Allow():
+			raise CircuitOpenError("Circuit open for host: {}".format(host))
+		attempt = 0
+		while True:
+			wait = 0
+			info = { 'method' : method, 'url' : url, 'host' : host, 'endpoint' : endpoint, 'attempt' : attempt }
+			try:
+				r = self._TimedRequest( pool_manager, method, url, headers, info, kwargs)
+			except urllib3.exceptions.HTTPError as err:
+				if attempt >= conf['retries'] or not self._Retryable(idempotent, err, conf):
+					breaker.Failure()
+					raise
+				logger.warning("Http retry {} : {}", host, err)
+			else:
+				if r.status not in self.my_retry_status or not idempotent or attempt >= conf['retries']:
+					if r.status >= 500:
+						breaker.Failure()
+					else:
+						breaker.Success()
+					return r
+				logger.warning("Http retry {} : status {}", host, r.status)
+				wait = self._RetryAfter(r)
+				r.drain_conn()
+				r.release_conn()
+			## full jitter backoff, at least Retry-After
+			backoff = random.uniform(0, min(conf['backoff_max'], conf['backoff'] * (2 ** attempt)))
+			time.sleep(min(conf['backoff_max'], max(backoff, wait)) if wait else backoff)
+			attempt += 1
+
+	def _ErrorResponse(self, r):
+		""" hook for non 200 responses """
+		pass
+
+	def _JsonResponse(self, r):
+		""" parse json from response, error object if not 200 """
+		if r.status==200:
+			return JsonCodec.loads( r.data )
+		self._ErrorResponse(r)
+		return { 'error' : True , 'status' : 'unknown' }
+
+	def _CompressBody(self, body, headers, compress=None):
+		""" compress body over compress_min, compress is gzip, zstd or blank """
+		conf = self._GlobalConf()
+		codec = conf['compress'] if compress is None else compress
+		if not codec or len(body) < conf['compress_min']:
+			return body
+		if codec == 'gzip':
+			body = gzip.compress(body, compresslevel=6)
+		elif codec == 'zstd' and zstandard:
+			body = zstandard.ZstdCompressor().compress(body)
+		else:
+			raise ValueError("Unknown compress: " + codec)
+		headers['Content-Encoding'] = codec
+		return body
+
+	def _SendJson(self, method, data, url, username, passwd, timeout=None, compress=None, headers=None):
+		""" send json data with method, compress overrides the registered body compression """
 
 		if len(url)<6:
-			raise ValueError("url icannot be empty")
+			raise ValueError("url cannot be empty")
+		## handle headers
+		headers = dict(headers) if headers else {}
+		self._PopulateBasicHeaderCreds( headers, username, passwd )
+		headers['Content-Type'] = 'application/json'
+
+		body = self._CompressBody(JsonCodec.dumpb(data), headers, compress)
+		r = self._Request( method, url, headers, timeout=timeout, body=body)
+		return self._JsonResponse(r)
+
+	def _FetchJson(self, url, username, passwd, fields, timeout=None):
+		""" get json data """
+
+		if len(url)<6:
+			raise ValueError("url cannot be empty")
 		## handle headers
 		headers = {}
 		self._PopulateBasicHeaderCreds( headers, username, passwd )
 
-		output = { 'error' : True , 'status' : 'unknown' }
-		with open(filename,'rb') as f:
-			file_data = f.read()
-			fields={ "file": ( os.path.basename(filename) , file_data) }
-			body, content_type = urllib3.filepost.encode_multipart_formdata(fields)
-			headers['Content-Type'] = content_type
-			
-			r = self.http.request( 'POST', url, headers=headers, body=body)
-			if r.status==200:
-				output = json.loads( r.data.decode('utf-8') )
+		r = self._Request( 'GET', url, headers, timeout=timeout, fields=fields)
+		return self._JsonResponse(r)
 
-		return output
+	def _GetCache(self):
+		""" shared response cache, made on first use """
+		if not HttpPostHandle.my_http_cache:
+			with HttpPostHandle.my_breaker_lock:
+				if not HttpPostHandle.my_http_cache:
+					HttpPostHandle.my_http_cache = LruCache(self._GlobalConf()['cache_size'])
+		return HttpPostHandle.my_http_cache
 
-	def PostJsonData(self, data, url, username, passwd):
-		""" post file as json data """
+	def GetCacheStats(self):
+		""" response cache stats, hits are served without a request, stale and revalidated are among the misses """
+		return self._GetCache().GetStats()
+
+	def _RequestKey(self, url, username, passwd, fields):
+		""" key from url, fields and auth identity """
+		ident = ''
+		if username:
+			ident = hashlib.sha256(':'.join([username, passwd]).encode('utf-8')).hexdigest()
+		return '|'.join([url, JsonCodec.dumps(fields, sort_keys=True), ident])
+
+	def _CacheFreshness(self, r):
+		""" fresh secs from Cache-Control, None if not to be stored """
+		directives = {}
+		for part in r.headers.get('Cache-Control', '').lower().split(','):
+			name, _, val = part.strip().partition('=')
+			directives[name] = val.strip('"')
+		if 'no-store' in directives:
+			return None
+		if 'no-cache' in directives:
+			return 0
+		if 'max-age' in directives:
+			try:
+				return max(0, int(directives['max-age']))
+			except ValueError:
+				return 0
+		return self._GlobalConf()['cache_ttl']
+
+	def _FetchJsonCached(self, url, username, passwd, fields, timeout=None):
+		""" get json data via cache, revalidates stale entries with etag / last-modified
+
+		the returned object is shared by all cache hits, treat it as read only
+		"""
 
 		if len(url)<6:
 			raise ValueError("url cannot be empty")
+		cache = self._GetCache()
+		key = self._RequestKey(url, username, passwd, fields)
+		## a stale entry still costs a round trip, counted as a miss
+		entry = cache.Get(key, count=False)
+		now = time.monotonic()
+		if entry and entry['expires'] > now:
+			cache.Count('hits')
+			return entry['data']
+		cache.Count('misses')
+		if entry:
+			cache.Count('stale')
+
 		## handle headers
 		headers = {}
 		self._PopulateBasicHeaderCreds( headers, username, passwd )
-		headers['Content-Type'] = 'application/json'
+		if entry and entry['etag']:
+			headers['If-None-Match'] = entry['etag']
+		if entry and entry['modified']:
+			headers['If-Modified-Since'] = entry['modified']
 
-		output = { 'error' : True , 'status' : 'unknown' }
-		r = self.http.request( 'POST', url, headers=headers, body=json.dumps(data))
-		# print(r.status)
+		r = self._Request( 'GET', url, headers, timeout=timeout, fields=fields)
+		if r.status==304 and entry:
+			cache.Count('revalidated')
+			## a 304 without Cache-Control keeps the stored freshness
+			fresh = self._CacheFreshness(r) if 'Cache-Control' in r.headers else entry['fresh']
+			entry['expires'] = now + (fresh if fresh else 0)
+			return entry['data']
 
+		output = self._JsonResponse(r)
 		if r.status==200:
-			output = json.loads( r.data.decode('utf-8') )
+			fresh = self._CacheFreshness(r)
+			etag = r.headers.get('ETag')
+			modified = r.headers.get('Last-Modified')
+			entry = { 'data' : output, 'etag' : etag, 'modified' : modified,
+				'fresh' : fresh, 'expires' : now + (fresh if fresh else 0) }
+			## with validators keep stale entries for revalidation
+			if fresh is not None and (etag or modified):
+				cache.Put(key, entry, ttl=0)
+			elif fresh:
+				cache.Put(key, entry, ttl=fresh)
 		return output
 
-	def GetJsonData(self, url, username, passwd, fields={}):
-		""" get file as json data """
+	def _GetShared(self, fetch, url, username, passwd, fields, timeout=None):
+		""" concurrent identical gets wait on one fetch and share its parsed result """
+		key = self._RequestKey(url, username, passwd, fields)
+		return HttpPostHandle.my_http_flights.Do(key, fetch, url, username, passwd, fields, timeout)
+
+	async def _GetSharedAsync(self, fetch, url, username, passwd, fields, timeout=None):
+		""" asyncio _GetShared, fetch runs on the default executor """
+		key = self._RequestKey(url, username, passwd, fields)
+		return await HttpPostHandle.my_http_flights.DoAsync(key, fetch, url, username, passwd, fields, timeout)
+
+	def _Coalesce(self, coalesce):
+		""" per call choice else registered default """
+		return self._GlobalConf()['coalesce'] if coalesce is None else coalesce
+
+	def PostFile(self, filename, url, username, passwd, chunked=False, timeout=None):
+		""" post file as form file, streamed from disk """
 
 		if len(url)<6:
-			raise ValueError("url cannot be empty")
+			raise ValueError("url icannot be empty")
 		## handle headers
 		headers = {}
 		self._PopulateBasicHeaderCreds( headers, username, passwd )
-		output = { 'error' : True , 'status' : 'unknown' }
 
-		r = self.http.request( 'GET', url, headers=headers, fields=fields)
+		stream = MultipartStream({ "file": ( os.path.basename(filename) , filename) })
+		headers['Content-Type'] = stream.content_type
+		if not chunked:
+			headers['Content-Length'] = str(stream.length)
+
+		r = self._Request( 'POST', url, headers, timeout=timeout,
+			body=stream, chunked=chunked, preload_content=False)
+		try:
+			output = self._JsonResponse(r)
+		finally:
+			r.release_conn()
 
-		if r.status==200:
-			output = json.loads( r.data.decode('utf-8') )
 		return output
 
+	def PostJsonData(self, data, url, username, passwd, timeout=None, compress=None):
+		""" post file as json data """
+		return self._SendJson( 'POST', data, url, username, passwd, timeout, compress)
+
+	def GetJsonData(self, url, username, passwd, fields={}, timeout=None, cache=False, coalesce=None):
+		""" get file as json data, cache for the shared response cache,
+		coalesce to share one fetch among concurrent identical calls
+		"""
+		fetch = self._FetchJsonCached if cache else self._FetchJson
+		if self._Coalesce(coalesce):
+			return self._GetShared( fetch, url, username, passwd, fields, timeout)
+		return fetch( url, username, passwd, fields, timeout)
+
+	def GetJsonStream(self, url, username, passwd, path, fields={}, timeout=None):
+		""" get json data as a stream, yields the values at path e.g. `items.*` """
+
+		if len(url)<6:
+			raise ValueError("url cannot be empty")
+		## handle headers
+		headers = {}
+		self._PopulateBasicHeaderCreds( headers, username, passwd )
+
+		r = self._Request( 'GET', url, headers, timeout=timeout, fields=fields, preload_content=False)
+		if r.status!=200:
+			self._ErrorResponse(r)
+			r.drain_conn()
+			r.release_conn()
+			raise ValueError("Http stream failed, status: {}".format(r.status))
+		done = False
+		try:
+			yield from JsonStream.items(r, path)
+			done = True
+		finally:
+			## stopped early, drop the connection rather than read the rest
+			if done:
+				r.drain_conn()
+				r.release_conn()
+			else:
+				r.close()
+
+	async def GetJsonDataAsync(self, url, username, passwd, fields={}, timeout=None, cache=False):
+		""" asyncio get file as json data, always coalesced """
+		fetch = self._FetchJsonCached if cache else self._FetchJson
+		return await self._GetSharedAsync( fetch, url, username, passwd, fields, timeout)
+
+	def _RequestOne(self, req):
+		""" one request of a batch, errors returned not raised """
+		try:
+			method = req.get('method', 'GET').upper()
+			url = self._RequiredField(req, 'url')
+			username = self._OptionalField(req, 'username')
+			passwd = self._OptionalField(req, 'passwd')
+			timeout = req.get('timeout')
+			if method == 'GET':
+				return self._FetchJson( url, username, passwd, req.get('fields', {}), timeout)
+			return self._SendJson( method, req.get('data', {}), url, username, passwd, timeout, headers=req.get('headers'))
+		except Exception as err:
+			logger.warning("Http batch error: {}", err)
+			return { 'error' : True , 'status' : 'exception', 'message' : str(err) }
+
+	def _RequestLane(self, reqs, jobs, results):
+		""" drains one host queue in a batch """
+		while True:
+			try:
+				pos = jobs.popleft()
+			except IndexError:
+				return
+			results[pos] = self._RequestOne(reqs[pos])
+
+	def RequestMany(self, reqs, max_workers=HTTP_FANOUT_WORKERS, per_host=HTTP_FANOUT_PER_HOST):
+		""" run a batch of requests concurrently, results in input order
+
+		each request has `url` and optional `method` (GET), `data` (json body),
+		`fields` (GET params), `username`, `passwd`, `timeout`, `headers` (non GET)
+		"""
+
+		results = [None] * len(reqs)
+		## one queue per host, drained by at most per_host lanes
+		hosts = {}
+		for pos, req in enumerate(reqs):
+			try:
+				host = urllib3.util.parse_url(req['url']).host
+			except Exception:
+				host = None
+			hosts.setdefault(host, deque()).append(pos)
+
+		lanes = []
+		for jobs in hosts.values():
+			lanes.extend([jobs] * min(per_host, len(jobs)))
+		if not lanes:
+			return results
+
+		with ThreadPoolExecutor(max_workers=min(max_workers, len(lanes))) as pool:
+			for jobs in lanes:
+				pool.submit(self._RequestLane, reqs, jobs, results)
+		return results
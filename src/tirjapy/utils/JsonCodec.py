@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+#
+# @project TirjaPy
+# @file src/tirjapy/utils/JsonCodec.py
+# @author  Shreos Roychowdhury <shreos@tirja.com>
+# @version 1.0.0
+# 
+# @section DESCRIPTION
+# 
+#   JsonCodec.py : json via orjson / ujson if installed, else json
+# 
+# @section LICENSE
+# 
+# Copyright (c) 2025 Shreos Roychowdhury.
+# Copyright (c) 2025 Tirja Consulting LLP.
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+# 
+
+import json
+
+try:
+	import orjson
+except ImportError:
+	orjson = None
+
+try:
+	import ujson
+except ImportError:
+	ujson = None
+
+## digits as 0, all else blanked, a run this long may be an integer orjson reads as float
+DIGIT_MAP = bytes(0x30 if 0x30 <= c <= 0x39 else 0x20 for c in range(256))
+DIGIT_RUN = b'0' * 19
+
+def _MayHoldBigInt(data):
+	""" true if data has a digit run past 64 bit range, translate is a c level pass """
+	if isinstance(data, str):
+		data = data.encode('utf-8', 'surrogatepass')
+	return DIGIT_RUN in data.translate(DIGIT_MAP)
+
+def dumpb(data, sort_keys=False):
+	""" json encode to utf-8 bytes
+
+	with orjson NaN and Infinity are written as null, json would write
+	the non standard NaN / Infinity tokens
+	"""
+	if orjson:
+		option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+		try:
+			return orjson.dumps(data, option=option)
+		except TypeError:
+			## ints over 64 bit and the like, json decides
+			pass
+	elif ujson:
+		try:
+			return ujson.dumps(data, ensure_ascii=False, escape_forward_slashes=False, sort_keys=sort_keys).encode('utf-8')
+		except (TypeError, OverflowError):
+			pass
+	return json.dumps(data, sort_keys=sort_keys).encode('utf-8')
+
+def dumps(data, sort_keys=False):
+	""" json encode to str """
+	if orjson or ujson:
+		return dumpb(data, sort_keys).decode('utf-8')
+	return json.dumps(data, sort_keys=sort_keys)
+
+def loads(data):
+	""" json decode from bytes or str, no decode copy needed
+
+	orjson reads integers past 64 bit as float, input with a long digit run
+	goes to json which keeps them exact
+	"""
+	if orjson and not _MayHoldBigInt(data):
+		try:
+			return orjson.loads(data)
+		except ValueError:
+			pass
+	elif ujson:
+		try:
+			return ujson.loads(data)
+		except ValueError:
+			pass
+	## also raises the error for bad input
+	return json.loads(data)
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+#
+# @project TirjaPy
+# @file src/tirjapy/utils/JsonStream.py
+# @author  Shreos Roychowdhury <shreos@tirja.com>
+# @version 1.0.0
+# 
+# @section DESCRIPTION
+# 
+#   JsonStream.py : incremental json item parsing from a stream
+# 
+# @section LICENSE
+# 
+# Copyright (c) 2025 Shreos Roychowdhury.
+# Copyright (c) 2025 Tirja Consulting LLP.
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+# 
+
+import json
+import codecs
+
+try:
+	import ijson
+except ImportError:
+	ijson = None
+
+from tirjapy.base.HandleConstants import HTTP_STREAM_CHUNK
+
+DECODER = json.JSONDecoder()
+SPACES = ' \t\r\n'
+
+class _Reader:
+	""" utf-8 text buffer over a binary stream """
+
+	def __init__(self, fobj, chunk_size):
+		""" reads fobj in chunk_size pieces """
+		self.fobj = fobj
+		self.chunk_size = chunk_size
+		self.decoder = codecs.getincrementaldecoder('utf-8')()
+		self.buf = ''
+		self.pos = 0
+		self.eof = False
+
+	def _More(self):
+		""" read more, at least as much as is buffered so big values parse in linear time """
+		if self.eof:
+			return
+		chunk = self.fobj.read(max(self.chunk_size, len(self.buf) - self.pos))
+		if not chunk:
+			self.eof = True
+		self.buf = self.buf[self.pos:] + self.decoder.decode(chunk if chunk else b'', final=self.eof)
+		self.pos = 0
+
+	def Peek(self):
+		""" next non space char, blank at end """
+		while True:
+			while self.pos < len(self.buf) and self.buf[self.pos] in SPACES:
+				self.pos += 1
+			if self.pos < len(self.buf):
+				return self.buf[self.pos]
+			if self.eof:
+				return ''
+			self._More()
+
+	def Take(self, chars):
+		""" consume next char, must be one of chars """
+		ch = self.Peek()
+		if not ch or ch not in chars:
+			raise ValueError("JsonStream: expected {} got {!r}".format(chars, ch))
+		self.pos += 1
+		return ch
+
+	def Value(self):
+		""" decode the next complete value """
+		self.Peek()
+		while True:
+			try:
+				val, end = DECODER.raw_decode(self.buf, self.pos)
+			except ValueError:
+				if self.eof:
+					raise
+			else:
+				## a number may continue in the next chunk
+				if end < len(self.buf) or self.eof:
+					self.pos = end
+					return val
+			self._More()
+
+def _Walk(reader, parts, top=True):
+	""" yield values under parts, `*` walks array items
+
+	top is False inside an array, the reader must then end past the value
+	"""
+	if not parts:
+		yield reader.Value()
+		return
+	head, rest = parts[0], parts[1:]
+	if head == '*':
+		if reader.Peek() != '[':
+			reader.Value()
+			return
+		reader.Take('[')
+		if reader.Peek() == ']':
+			reader.Take(']')
+			return
+		while True:
+			yield from _Walk(reader, rest, False)
+			if reader.Take(',]') == ']':
+				return
+	if reader.Peek() != '{':
+		reader.Value()
+		return
+	reader.Take('{')
+	if reader.Peek() == '}':
+		reader.Take('}')
+		return
+	while True:
+		key = reader.Value()
+		if not isinstance(key, str):
+			raise ValueError("JsonStream: bad object key")
+		reader.Take(':')
+		if key == head:
+			yield from _Walk(reader, rest, top)
+			if top:
+				## rest of the document is not needed
+				return
+		else:
+			reader.Value()
+		if reader.Take(',}') == '}':
+			return
+
+def items(fobj, path, chunk_size=HTTP_STREAM_CHUNK):
+	""" yield values at dotted path from a binary stream, `*` matches array items
+
+	e.g. `items.*` yields each element of the top level `items` array,
+	uses ijson when installed
+	"""
+	parts = path.split('.') if path else []
+	if ijson:
+		prefix = '.'.join(['item' if p == '*' else p for p in parts])
+		yield from ijson.items(fobj, prefix, use_float=True)
+		return
+	yield from _Walk(_Reader(fobj, chunk_size), parts)
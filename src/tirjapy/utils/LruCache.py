@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+#
+# @project TirjaPy
+# @file src/tirjapy/utils/LruCache.py
+# @author  Shreos Roychowdhury <shreos@tirja.com>
+# @version 1.0.0
+# 
+# @section DESCRIPTION
+# 
+#   LruCache.py : thread safe lru cache with ttl
+# 
+# @section LICENSE
+# 
+# Copyright (c) 2025 Shreos Roychowdhury.
+# Copyright (c) 2025 Tirja Consulting LLP.
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+# 
+
+import time
+import threading
+from collections import OrderedDict
+
+class LruCache:
+	""" thread safe lru cache, entries optionally expire after ttl secs """
+
+	def __init__(self, size, ttl=0):
+		""" ttl of 0 keeps entries until evicted """
+		self.size = size
+		self.ttl = ttl
+		self.lock = threading.Lock()
+		self.items = OrderedDict()
+		self.stats = { 'hits' : 0, 'misses' : 0 }
+
+	def Get(self, key, default=None, count=True):
+		""" get value and mark recently used, count False leaves hit / miss stats to the caller """
+		now = time.monotonic()
+		with self.lock:
+			item = self.items.get(key)
+			if item is not None and item[0] and item[0] < now:
+				del self.items[key]
+				item = None
+			if item is None:
+				if count:
+					self.stats['misses'] += 1
+				return default
+			self.items.move_to_end(key)
+			if count:
+				self.stats['hits'] += 1
+			return item[1]
+
+	def Put(self, key, value, ttl=None):
+		""" set value, evict least recently used over size """
+		ttl = self.ttl if ttl is None else ttl
+		expires = time.monotonic() + ttl if ttl else 0
+		with self.lock:
+			self.items[key] = (expires, value)
+			self.items.move_to_end(key)
+			while len(self.items) > self.size:
+				self.items.popitem(last=False)
+
+	def SetIfAbsent(self, key, value, ttl=None):
+		""" set value if key is missing or expired, True if set """
+		ttl = self.ttl if ttl is None else ttl
+		now = time.monotonic()
+		with self.lock:
+			item = self.items.get(key)
+			if item is not None and not (item[0] and item[0] < now):
+				self.items.move_to_end(key)
+				self.stats['hits'] += 1
+				return False
+			self.stats['misses'] += 1
+			self.items[key] = (now + ttl if ttl else 0, value)
+			self.items.move_to_end(key)
+			while len(self.items) > self.size:
+				self.items.popitem(last=False)
+			return True
+
+	def Pop(self, key, default=None):
+		""" remove key """
+		with self.lock:
+			item = self.items.pop(key, None)
+		return default if item is None else item[1]
+
+	def Clear(self):
+		""" remove all """
+		with self.lock:
+			self.items.clear()
+
+	def Count(self, name, incr=1):
+		""" bump a named stat """
+		with self.lock:
+			self.stats[name] = self.stats.get(name, 0) + incr
+
+	def GetStats(self):
+		""" stats and entry count """
+		with self.lock:
+			return { **self.stats, 'entries' : len(self.items), 'size' : self.size }
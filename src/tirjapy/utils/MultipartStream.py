@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+#
+# @project TirjaPy
+# @file src/tirjapy/utils/MultipartStream.py
+# @author  Shreos Roychowdhury <shreos@tirja.com>
+# @version 1.0.0
+# 
+# @section DESCRIPTION
+# 
+#   MultipartStream.py : multipart form body streamed from disk
+# 
+# @section LICENSE
+# 
+# Copyright (c) 2025 Shreos Roychowdhury.
+# Copyright (c) 2025 Tirja Consulting LLP.
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+# 
+
+import os
+import mimetypes
+import urllib3
+
+from tirjapy.base.HandleConstants import HTTP_STREAM_CHUNK
+
+MIME_UNKNOWN = 'application/octet-stream'
+
+class MultipartStream:
+	""" multipart/form-data body read from disk in chunks, with known length """
+
+	def __init__(self, fields, boundary=None, chunk_size=HTTP_STREAM_CHUNK):
+		"""
+		fields maps name to a value, or to (filename, path) or (filename, path, mime)
+		for a file part read from path
+		"""
+		self.boundary = boundary if boundary else urllib3.filepost.choose_boundary()
+		self.chunk_size = chunk_size
+		self.content_type = "multipart/form-data; boundary={}".format(self.boundary)
+
+		## parts are (head, data, path), one of data or path set
+		self.parts = []
+		self.length = 0
+		for name, value in fields.items():
+			if isinstance(value, tuple):
+				filename, path = value[0], value[1]
+				mime = value[2] if len(value) > 2 else mimetypes.guess_type(filename)[0]
+				field = urllib3.fields.RequestField(name, b'', filename=filename)
+				field.make_multipart(content_type=mime if mime else MIME_UNKNOWN)
+				head = self._PartHead(field)
+				self.parts.append((head, None, path))
+				self.length += len(head) + os.path.getsize(path) + 2
+			else:
+				data = value if isinstance(value, bytes) else str(value).encode('utf-8')
+				field = urllib3.fields.RequestField(name, data)
+				field.make_multipart()
+				head = self._PartHead(field)
+				self.parts.append((head, data, None))
+				self.length += len(head) + len(data) + 2
+		self.tail = "--{}--\r\n".format(self.boundary).encode('latin-1')
+		self.length += len(self.tail)
+
+	def _PartHead(self, field):
+		""" boundary and headers of one part """
+		return "--{}\r\n".format(self.boundary).encode('latin-1') + field.render_headers().encode('utf-8')
+
+	def __iter__(self):
+		""" yields the body, files are reopened so the body can be resent """
+		for head, data, path in self.parts:
+			yield head
+			if path is None:
+				yield data
+			else:
+				with open(path, 'rb') as f:
+					while True:
+						chunk = f.read(self.chunk_size)
+						if not chunk:
+							break
+						yield chunk
+			yield b'\r\n'
+		yield self.tail
@@ -36,17 +36,54 @@ from loguru import logger
 
 import os
 import sys
+import io
+import csv
+import gzip
 import json
+import time
+import queue
+import atexit
+import shutil
+import tempfile
+import threading
 
 import mysql.connector
 from mysql.connector import errorcode
 
+try:
+	import zstandard
+except ImportError:
+	zstandard = None
+
 from tirjapy.utils.HandleQuotes import HandleQuotes
+from tirjapy.utils.JcsvData import JcsvData
+from tirjapy.base.HandleConstants import \
+	MYSQL_FETCH_SIZE, MYSQL_EXPORT_QUEUE, MYSQL_EXPORT_BLOCK, MYSQL_BULK_BATCH, \
+	MYSQL_PING_IDLE, MYSQL_BULK_WARNINGS
+
+## escapes for LOAD DATA with default FIELDS ESCAPED BY '\\'
+BULK_ESCAPES = str.maketrans({ '\\' : '\\\\', '\t' : '\\t', '\n' : '\\n', '\r' : '\\r', '\0' : '\\0' })
+
+## load data local refused by server or client
+BULK_DISABLED_ERRORS = (
+	errorcode.ER_NOT_ALLOWED_COMMAND,
+	errorcode.ER_CLIENT_LOCAL_FILES_DISABLED,
+	errorcode.CR_LOAD_DATA_LOCAL_INFILE_REJECTED,
+)
+
+## session dropped by server, safe to reconnect and retry a select
+LOST_SESSION_ERRORS = (
+	errorcode.CR_SERVER_GONE_ERROR,
+	errorcode.CR_SERVER_LOST,
+	errorcode.CR_SERVER_LOST_EXTENDED,
+)
 
 class MysqlHandleBase(HandleQuotes):
 	""" mysql handled class """
 
 	my_creds = None
+	local_infile = None
+	bulk_tmp = None
 
 	def __init__(self):
 		""" constructor default"""
@@ -69,10 +106,43 @@ class MysqlHandleBase(HandleQuotes):
 		self.session = mysql.connector.connect(
     	host= MysqlHandleBase.my_creds['host'], port= MysqlHandleBase.my_creds['port'],
 			user= MysqlHandleBase.my_creds['user'], password= MysqlHandleBase.my_creds['pass'],
+			allow_local_infile_in_path= MysqlHandleBase.my_creds['bulk_dir'],
 			autocommit=True)
 		self.db_main = MysqlHandleBase.my_creds['db_main']
+		self.last_used = time.monotonic()
 		self.is_init = True
 
+	def _ReconnectMysql(self):
+		""" drop the session and connect again """
+		try:
+			self.session.close()
+		except:
+			pass
+		self.is_init = False
+		self._InitMysql()
+		logger.info("Mysql : reconnected")
+
+	def _GetSession(self, db):
+		""" checkout session on db, ping first only if idle too long """
+		now = time.monotonic()
+		if now - self.last_used > MysqlHandleBase.my_creds['ping_idle']:
+			try:
+				self.session.ping(reconnect=True, attempts=2, delay=0)
+			except mysql.connector.Error as err:
+				logger.warning("Mysql ping failed: {}", err.msg)
+				self._ReconnectMysql()
+		self.last_used = now
+		## the USE is a round trip, a session dropped inside the idle window fails here
+		try:
+			self.session.database = db
+		except mysql.connector.Error as err:
+			if err.errno not in LOST_SESSION_ERRORS:
+				raise
+			logger.warning("Mysql session lost: {}", err.msg)
+			self._ReconnectMysql()
+			self.session.database = db
+		return self.session
+
 	def RegisterGlobals(self, params):
 		"""Register Global fx"""
 
@@ -82,17 +152,25 @@ class MysqlHandleBase(HandleQuotes):
 			'user' : self._RequiredField(params, 'user'),
 			'pass' : self._RequiredField(params, 'pass'),
 			'db_main' : self._RequiredField(params, 'db_main'),
+			'bulk_dir' : self._OptionalField(params, 'bulk_dir') or self._BulkTmp(),
+			'ping_idle' : self._OptionalFloat(params, 'ping_idle', MYSQL_PING_IDLE),
 		}
 		self._InitMysql()
 
+	def _BulkTmp(self):
+		""" private 0700 dir made once per process, the server may ask for any file under it """
+		if not MysqlHandleBase.bulk_tmp:
+			MysqlHandleBase.bulk_tmp = tempfile.mkdtemp(prefix='tirjapy-bulk-')
+			atexit.register(shutil.rmtree, MysqlHandleBase.bulk_tmp, True)
+		return MysqlHandleBase.bulk_tmp
+
 	def _CheckInit(self):
 		if not self.is_init:
 			raise ValueError("Mysql Vars not found")
 
 	def _MysqlUpdate(self, db, sql, multi=False):
 		""" Internal Mysql Update Handler"""
-		session = self.session
-		session.database = db
+		session = self._GetSession(db)
 		cursor = session.cursor()
 
 		noerr = False
@@ -113,8 +191,7 @@ class MysqlHandleBase(HandleQuotes):
 
 	def _MysqlUpdateTuple(self, db, sql, tvals):
 		""" Internal Mysql Update Handler"""
-		session = self.session
-		session.database = db
+		session = self._GetSession(db)
 		cursor = session.cursor()
 
 		noerr = False
@@ -127,36 +204,42 @@ class MysqlHandleBase(HandleQuotes):
 		cursor.close()
 		return noerr
 
-	def _MysqlSelect(self, db, sql):
-		""" Internal Mysql Select Handler"""
+	def _MysqlSelect(self, db, sql, retry=True):
+		""" Internal Mysql Select Handler, retries once on a lost session"""
 
-		session = self.session
-		session.database = db
+		session = self._GetSession(db)
 		cursor = session.cursor()
 		data = []
+		lost = False
 		try:
 			cursor.execute(sql)
 			while True:
-				rows = cursor.fetchmany(1000)
+				rows = cursor.fetchmany(MYSQL_FETCH_SIZE)
 				if not rows:
 					break
 				data.extend(rows)
 		except mysql.connector.Error as err:
+			lost = err.errno in LOST_SESSION_ERRORS
 			logger.warning(err.msg)
 
-		cursor.close()
+		try:
+			cursor.close()
+		except mysql.connector.Error:
+			pass
+		if lost and retry:
+			self._ReconnectMysql()
+			return self._MysqlSelect(db, sql, retry=False)
 		return data
 
-	def _MysqlSelectToWriter(self, db, sql, tsv_writer):
+	def _MysqlSelectToWriter(self, db, sql, tsv_writer, fetch_size=MYSQL_FETCH_SIZE):
 		""" Internal Mysql Select Handler to tsv_writer"""
 
-		session = self.session
-		session.database = db
+		session = self._GetSession(db)
 		cursor = session.cursor()
 		try:
 			cursor.execute(sql)
 			while True:
-				rows = cursor.fetchmany(1000)
+				rows = cursor.fetchmany(fetch_size)
 				if not rows:
 					break
 				tsv_writer.writerows(rows)
@@ -165,12 +248,122 @@ class MysqlHandleBase(HandleQuotes):
 
 		cursor.close()
 
+	def _OpenExportFile(self, path, compress):
+		""" open export file for writing, compress is gzip, zstd or blank """
+		if not compress:
+			return open(path, 'wb')
+		if compress == 'gzip':
+			## level 6 keeps up with the fetch rate, 9 does not
+			return gzip.open(path, 'wb', compresslevel=6)
+		if compress == 'zstd':
+			if not zstandard:
+				raise ValueError("zstd export needs zstandard installed")
+			return zstandard.ZstdCompressor().stream_writer(open(path, 'wb'), closefd=True)
+		raise ValueError("Unknown compress: " + compress)
+
+	def _ExportWorker(self, batches, fobj, block_size, progress, state):
+		""" export thread : format batches to tsv, write in blocks """
+		buf = io.StringIO()
+		writer = csv.writer(buf, delimiter='\t', lineterminator='\n')
+		block = bytearray()
+		while True:
+			rows = batches.get()
+			if rows is None:
+				break
+			## on error keep draining so the reader never blocks
+			if state['error']:
+				continue
+			try:
+				writer.writerows(rows)
+				block += buf.getvalue().encode('utf-8')
+				buf.seek(0)
+				buf.truncate()
+				state['rows'] += len(rows)
+				if len(block) >= block_size:
+					fobj.write(block)
+					state['bytes'] += len(block)
+					block.clear()
+				if progress:
+					progress(state['rows'], state['bytes'])
+			except Exception as err:
+				state['error'] = err
+		if block and not state['error']:
+			try:
+				fobj.write(block)
+				state['bytes'] += len(block)
+				if progress:
+					progress(state['rows'], state['bytes'])
+			except Exception as err:
+				state['error'] = err
+
+	def _MysqlSelectToFile(self, db, sql, path, compress='gzip', header=False,
+		fetch_size=MYSQL_FETCH_SIZE, block_size=MYSQL_EXPORT_BLOCK, progress=None):
+		""" Internal Mysql Select Handler to tsv file, fetch overlaps format and write
+
+		progress is called from the export thread as progress(rows, bytes),
+		bytes being the uncompressed tsv bytes written so far ; on failure
+		the partial file is removed
+		"""
+
+		## before the worker starts, errors here leave nothing to clean up
+		session = self._GetSession(db)
+		cursor = session.cursor()
+		try:
+			fobj = self._OpenExportFile(path, compress)
+		except:
+			cursor.close()
+			raise
+		batches = queue.Queue(maxsize=MYSQL_EXPORT_QUEUE)
+		state = { 'rows' : 0, 'bytes' : 0, 'error' : None }
+		worker = threading.Thread(target=self._ExportWorker,
+			args=(batches, fobj, block_size, progress, state), daemon=True)
+		worker.start()
+
+		noerr = False
+		try:
+			cursor.execute(sql)
+			## worker is idle until the first batch, safe to write here
+			if header:
+				fobj.write(('\t'.join(cursor.column_names) + '\n').encode('utf-8'))
+			while not state['error']:
+				rows = cursor.fetchmany(fetch_size)
+				if not rows:
+					break
+				batches.put(rows)
+			noerr = True
+		except mysql.connector.Error as err:
+			logger.warning(err.msg)
+		finally:
+			batches.put(None)
+			worker.join()
+			try:
+				## an export error leaves rows unread, close would raise and the session stays blocked
+				if session.unread_result:
+					session.consume_results()
+				cursor.close()
+			except mysql.connector.Error as err:
+				logger.warning(err.msg)
+			finally:
+				try:
+					fobj.close()
+				except Exception as err:
+					state['error'] = state['error'] or err
+
+		if state['error']:
+			logger.warning("Mysql export: {}", state['error'])
+			noerr = False
+		if not noerr:
+			try:
+				os.remove(path)
+			except FileNotFoundError:
+				pass
+		return noerr
+
 	def _MysqlGetLastInsert(self, db, sql):
 		""" Mysql Fx to get last id """
 
 		toret = 0
-		session = self.session
-		session.database = db
+		session = self._GetSession(db)
 		cursor = session.cursor()
 		try:
 			cursor.execute(sql)
@@ -180,3 +373,150 @@ class MysqlHandleBase(HandleQuotes):
 
 		cursor.close()
 		return toret
+
+	def _BulkEscape(self, val):
+		""" escape one value for load data tsv, bytes as hex for UNHEX """
+		if val is None:
+			return '\\N'
+		if isinstance(val, bool):
+			return '1' if val else '0'
+		if isinstance(val, (bytes, bytearray, memoryview)):
+			return bytes(val).hex()
+		return str(val).translate(BULK_ESCAPES)
+
+	def _BulkLine(self, row, binary):
+		""" tsv line of a row, None if a column mixes bytes and other values
+
+		binary holds per column whether its first non null value was bytes
+		"""
+		fields = []
+		for pos, val in enumerate(row):
+			if val is not None:
+				isbytes = isinstance(val, (bytes, bytearray, memoryview))
+				if binary[pos] is None:
+					binary[pos] = isbytes
+				elif binary[pos] != isbytes:
+					return None
+			fields.append(self._BulkEscape(val))
+		return '\t'.join(fields)
+
+	def _MysqlLocalInfile(self):
+		""" check once if server allows load data local, a failed check is asked again next time """
+		if MysqlHandleBase.local_infile is None:
+			data = self._MysqlSelect(self.db_main, "SELECT @@GLOBAL.local_infile")
+			if not data:
+				logger.warning("Mysql BulkLoad : local_infile check failed, using insert")
+				return False
+			MysqlHandleBase.local_infile = int(data[0][0]) == 1
+			if not MysqlHandleBase.local_infile:
+				logger.info("Mysql BulkLoad : local_infile off, using insert")
+		return MysqlHandleBase.local_infile
+
+	def _BulkWarnings(self, cursor, table):
+		""" False if load data warned, LOCAL turns duplicate and conversion errors into warnings and skips rows """
+		count = cursor.warning_count
+		if not count:
+			return True
+		cursor.execute("SHOW WARNINGS LIMIT {}".format(MYSQL_BULK_WARNINGS))
+		for level, code, msg in cursor.fetchall():
+			logger.warning("Mysql BulkLoad {} : {} {} {}", table, level, code, msg)
+		logger.warning("Mysql BulkLoad {} : {} warnings, rows dropped or changed", table, count)
+		return False
+
+	def _MysqlLoadData(self, db, table, rows, columns):
+		""" Internal load data local infile via temp tsv, None if disabled
+
+		bytes columns are loaded as hex through UNHEX, rows that mix bytes and
+		other values in a column are inserted after the load
+		"""
+
+		binary = [None] * len(columns)
+		mixed = []
+		tfile = tempfile.NamedTemporaryFile('w', encoding='utf-8', newline='',
+			dir=MysqlHandleBase.my_creds['bulk_dir'], suffix='.tsv', delete=False)
+		try:
+			with tfile:
+				lines = []
+				for row in rows:
+					line = self._BulkLine(row, binary)
+					if line is None:
+						mixed.append(row)
+						continue
+					lines.append(line)
+					if len(lines) >= MYSQL_BULK_BATCH:
+						tfile.write('\n'.join(lines) + '\n')
+						lines = []
+				if lines:
+					tfile.write('\n'.join(lines) + '\n')
+
+			targets = [ '@b{}'.format(pos) if binary[pos] else self._AddBackQ(col) for pos, col in enumerate(columns) ]
+			unhex = [ '{} = UNHEX(@b{})'.format(self._AddBackQ(col), pos) for pos, col in enumerate(columns) if binary[pos] ]
+			sql = ("LOAD DATA LOCAL INFILE '{}' INTO TABLE {} CHARACTER SET utf8mb4"
+				" FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' ({})").format(
+				tfile.name.replace("'", "\\'"), self._AddBackQ(table), ', '.join(targets))
+			if unhex:
+				sql += " SET " + ', '.join(unhex)
+
+			session = self._GetSession(db)
+			cursor = session.cursor()
+			noerr = False
+			try:
+				cursor.execute(sql)
+				noerr = self._BulkWarnings(cursor, table)
+			except mysql.connector.Error as err:
+				if err.errno in BULK_DISABLED_ERRORS:
+					MysqlHandleBase.local_infile = False
+					noerr = None
+				logger.warning(err.msg)
+			cursor.close()
+			if noerr and mixed:
+				logger.info("Mysql BulkLoad {} : {} mixed type rows by insert", table, len(mixed))
+				noerr = self._MysqlInsertMany(db, table, mixed, columns)
+			return noerr
+		finally:
+			os.remove(tfile.name)
+
+	def _MysqlInsertMany(self, db, table, rows, columns, batch=MYSQL_BULK_BATCH):
+		""" Internal multi-row insert in batches """
+
+		sql = "INSERT INTO {} ({}) VALUES ({})".format(
+			self._AddBackQ(table), self._JoinEachBackQ(columns), ', '.join(['%s'] * len(columns)))
+		session = self._GetSession(db)
+		cursor = session.cursor()
+
+		noerr = False
+		try:
+			chunk = []
+			for row in rows:
+				chunk.append(tuple(row))
+				if len(chunk) >= batch:
+					cursor.executemany(sql, chunk)
+					chunk = []
+			if chunk:
+				cursor.executemany(sql, chunk)
+			noerr = True
+		except mysql.connector.Error as err:
+			logger.warning(err.msg)
+
+		cursor.close()
+		return noerr
+
+	def BulkLoad(self, db, table, rows, columns=None):
+		""" Bulk load rows or JcsvData into table, load data local else insert, False on errors or warnings """
+
+		self._CheckInit()
+		if isinstance(rows, JcsvData):
+			columns = columns if columns else rows.GetHeaders()
+			rows = rows.GetRows()
+		if not columns:
+			raise ValueError("BulkLoad: columns not set")
+
+		if self._MysqlLocalInfile():
+			noerr = self._MysqlLoadData(db, table, rows, columns)
+			if noerr is not None:
+				return noerr
+			## rows already consumed unless it is a sequence
+			if not isinstance(rows, (list, tuple)):
+				logger.warning("Mysql BulkLoad : local_infile refused, rows not replayable")
+				return False
+		return self._MysqlInsertMany(db, table, rows, columns)
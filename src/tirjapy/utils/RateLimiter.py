@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+#
+# @project TirjaPy
+# @file src/tirjapy/utils/RateLimiter.py
+# @author  Shreos Roychowdhury <shreos@tirja.com>
+# @version 1.0.0
+# 
+# @section DESCRIPTION
+# 
+#   RateLimiter.py : thread safe token bucket
+# 
+# @section LICENSE
+# 
+# Copyright (c) 2025 Shreos Roychowdhury.
+# Copyright (c) 2025 Tirja Consulting LLP.
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+# 
+
+import time
+import threading
+
+class TokenBucket:
+	""" thread safe token bucket, `rate` tokens per sec up to `burst` """
+
+	def __init__(self, rate, burst):
+		""" rate of 0 never waits, except out a Pause """
+		self.rate = rate
+		self.burst = max(burst, 1)
+		self.tokens = self.burst
+		self.stamp = time.monotonic()
+		self.hold = 0.0
+		self.lock = threading.Lock()
+
+	def Acquire(self, tokens=1):
+		""" wait for tokens, also waits out a Pause even with rate 0 """
+		while True:
+			with self.lock:
+				now = time.monotonic()
+				if now < self.hold:
+					wait = self.hold - now
+				elif self.rate <= 0:
+					return
+				else:
+					self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+					self.stamp = now
+					if self.tokens >= tokens:
+						self.tokens -= tokens
+						return
+					wait = (tokens - self.tokens) / self.rate
+			time.sleep(wait)
+
+	def Pause(self, secs):
+		""" stop all callers for secs, refill starts after """
+		with self.lock:
+			self.hold = max(self.hold, time.monotonic() + secs)
+			self.tokens = 0
+			self.stamp = self.hold
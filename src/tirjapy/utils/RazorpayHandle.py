@@ -37,11 +37,20 @@ from loguru import logger
 import os
 import sys
 import re
+import copy
 import json
+import time
+import hashlib
+import itertools
+import threading
 import urllib3
 from base64 import b64encode
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
-from tirjapy.utils.HttpPostHandle import HttpPostHandle
+from tirjapy.utils.HttpPostHandle import HttpPostHandle, RETRY_STATUS
+from tirjapy.utils.RateLimiter import TokenBucket
+from tirjapy.utils.LruCache import LruCache
 
 RAZORPAY_BASE_URL                   = 'https://api.razorpay.com'
 RAZORPAY_V1                         = RAZORPAY_BASE_URL + '/v1'
@@ -75,10 +84,42 @@ RAZORPAY_DOCUMENT                   = RAZORPAY_V1 +  '/documents'
 RAZORPAY_DISPUTE                    = RAZORPAY_V1 +  '/disputes'
 RAZORPAY_DEVICE_ACTIVITY_URL        = RAZORPAY_V1 +  '/devices/activity'
 
-RAZORPAY_USER_AGENT = os.environ.get('RAZORPAY_USER_AGENT', 'Razorpay-Python/1.4.2 TirjaPy/1.1.2')
+RAZORPAY_USER_AGENT = os.environ.get('RAZORPAY_USER_AGENT', 'Razorpay-Python/1.4.2 TirjaPy/1.1.3')
+
+RAZORPAY_PAGE_SIZE                  = 100         # max count per list call
+RAZORPAY_PREFETCH                   = 2           # pages fetched ahead in IterAll
+RAZORPAY_THROTTLE_RETRIES           = 3           # retries after a 429
+RAZORPAY_THROTTLE_WAIT              = 1.0         # secs before retry if no Retry-After, doubled
+RAZORPAY_BATCH_WORKERS              = 8           # concurrent calls in PostMany / PatchMany
+RAZORPAY_RECEIPT_LEN                = 40          # max length of a receipt
+RAZORPAY_ENTITY_CACHE_SIZE          = 4096        # entities held by the entity cache
+
+## entity cache ttl secs by entity url, names for RegisterEntityCache are the last url part
+RAZORPAY_ENTITY_TTL = {
+	RAZORPAY_PLAN_URL : 3600,
+	RAZORPAY_ITEM_URL : 3600,
+	RAZORPAY_ADDON_URL : 600,
+	RAZORPAY_CUSTOMER_URL : 300,
+}
+
+## field PostMany fills with the batch key by entity path, other entities take neither
+RAZORPAY_BATCH_KEY_FIELD = {
+	'orders' : 'receipt',
+	'payment_links' : 'reference_id',
+}
 
 class RazorpayHandle(HttpPostHandle):
 
+	rzp_limits = {}
+	rzp_entity_cache = None
+	rzp_entity_ttl = {}
+	## write generation per entity key, values from one counter never repeat after eviction
+	rzp_entity_gens = None
+	rzp_entity_gen_count = itertools.count(1)
+	rzp_entity_lock = threading.Lock()
+	## 429 is waited out in _Request with the rate buckets, not also in the base retries
+	my_retry_status = RETRY_STATUS - {429}
+
 	def __init__(self):
 		""" init fx inits handles """
 		super().__init__()
@@ -93,54 +134,165 @@ class RazorpayHandle(HttpPostHandle):
 			headers['Authorization'] = "Basic {}".format(base64creds.decode('ascii'))
 		headers['User-Agent'] = RAZORPAY_USER_AGENT
 
-	def _PostJsonData(self, data, url, username, passwd, post='POST'):
-		""" post file as json data """
+	def RegisterRateLimits(self, params):
+		""" Register process wide limits, maps group to { rate, burst }
 
-		if len(url)<6:
-			raise ValueError("url cannot be empty")
-		## handle headers
-		headers = {}
-		self._PopulateBasicHeaderCreds( headers, username, passwd )
-		headers['Content-Type'] = 'application/json'
+		group is the first path part after the api version, e.g. `payments`,
+		`payouts`, or `default` for the rest
+		"""
+		limits = {}
+		for group, lparams in params.items():
+			rate = self._RequiredFloat(lparams, 'rate')
+			limits[group] = TokenBucket(rate, self._OptionalInteger(lparams, 'burst', max(1, int(rate))))
+		RazorpayHandle.rzp_limits = limits
 
-		output = { 'error' : True , 'status' : 'unknown' }
-		r = self.http.request( post, url, headers=headers, body=json.dumps(data))
-		# print(r.status)
+	def _RateBucket(self, url):
+		""" bucket for the url group, else default, else None """
+		limits = RazorpayHandle.rzp_limits
+		if not limits:
+			return None
+		parts = urllib3.util.parse_url(url).path.strip('/').split('/')
+		group = parts[1] if len(parts) > 1 else ''
+		return limits.get(group, limits.get('default'))
 
-		if r.status==200:
-			output = json.loads( r.data.decode('utf-8') )
-		else:
-			try:
-				logger.warning("RZP Error: {}" , r.data.decode('utf-8'))
-			except:
-				logger.warning("RZP Error: UNKNOWN")
-		return output
+	def _Request(self, method, url, headers, timeout=None, **kwargs):
+		""" rate limited request, waits out 429 with Retry-After for all threads """
+		bucket = self._RateBucket(url)
+		attempt = 0
+		while True:
+			if bucket:
+				bucket.Acquire()
+			r = super()._Request( method, url, headers, timeout, **kwargs)
+			if r.status != 429 or attempt >= RAZORPAY_THROTTLE_RETRIES:
+				return r
+			wait = self._RetryAfter(r)
+			if not wait:
+				wait = RAZORPAY_THROTTLE_WAIT * (2 ** attempt)
+			logger.warning("RZP throttled, retry in {:.2f}s", wait)
+			r.drain_conn()
+			r.release_conn()
+			if bucket:
+				bucket.Pause(wait)
+			else:
+				time.sleep(wait)
+			attempt += 1
 
-	def _GetJsonData(self, url, username, passwd, fields={}):
-		""" get file as json data """
+	def RegisterEntityCache(self, params={}):
+		""" Register the process wide entity cache, `size` and ttl secs by name, e.g. `plans`
 
-		if len(url)<6:
-			raise ValueError("url cannot be empty")
-		## handle headers
-		headers = {}
-		self._PopulateBasicHeaderCreds( headers, username, passwd )
-		output = { 'error' : True , 'status' : 'unknown' }
+		GetData of a plan, item, addon or customer by id is then served from
+		the cache, writes to the same entity drop it ; a ttl of 0 keeps that
+		type out of the cache
+		"""
+		ttls = {}
+		for url, ttl in RAZORPAY_ENTITY_TTL.items():
+			ttl = self._OptionalInteger(params, url.rsplit('/', 1)[1], ttl)
+			if ttl > 0:
+				ttls[url] = ttl
+		size = self._OptionalInteger(params, 'size', RAZORPAY_ENTITY_CACHE_SIZE)
+		RazorpayHandle.rzp_entity_ttl = ttls
+		RazorpayHandle.rzp_entity_gens = LruCache(size)
+		RazorpayHandle.rzp_entity_cache = LruCache(size)
 
-		r = self.http.request( 'GET', url, headers=headers, fields=fields)
+	def GetEntityCacheStats(self):
+		""" entity cache stats, empty if not registered """
+		cache = RazorpayHandle.rzp_entity_cache
+		return cache.GetStats() if cache else {}
 
-		if r.status==200:
-			output = json.loads( r.data.decode('utf-8') )
-		else:
-			try:
-				logger.warning("RZP Error: {}" , r.data.decode('utf-8'))
-			except:
-				logger.warning("RZP Error: UNKNOWN")
-		return output
+	def _EntityKey(self, url, exact=True):
+		""" (key, ttl) of a cached entity url, also of its sub paths unless exact """
+		if RazorpayHandle.rzp_entity_cache:
+			for entity_url, ttl in RazorpayHandle.rzp_entity_ttl.items():
+				if url.startswith(entity_url + '/'):
+					entity_id, _, sub = url[len(entity_url) + 1:].partition('?')[0].strip('/').partition('/')
+					if entity_id and not (exact and sub):
+						return (self.username, entity_url, entity_id), ttl
+		return None, 0
+
+	def _GetEntity(self, url, key, ttl):
+		""" read through the entity cache, misses share one fetch per write generation """
+		cache = RazorpayHandle.rzp_entity_cache
+		entity = cache.Get(key)
+		if entity is not None:
+			return entity
+		## a fetch that straddles a write may be stale, it is returned but not cached
+		gen = RazorpayHandle.rzp_entity_gens.Get(key, 0)
+		flight = (self._RequestKey(url, self.username, self.passwd, {}), gen)
+		entity = HttpPostHandle.my_http_flights.Do(flight, self._FetchJson, url, self.username, self.passwd, {}, None)
+		if isinstance(entity, dict) and 'id' in entity:
+			with RazorpayHandle.rzp_entity_lock:
+				if RazorpayHandle.rzp_entity_gens.Get(key, 0) == gen:
+					cache.Put(key, entity, ttl=ttl)
+		return entity
+
+	def _DropEntity(self, url):
+		""" drop the cached entity a write to url touches """
+		key, _ = self._EntityKey(url, exact=False)
+		if key:
+			with RazorpayHandle.rzp_entity_lock:
+				RazorpayHandle.rzp_entity_gens.Put(key, next(RazorpayHandle.rzp_entity_gen_count))
+				RazorpayHandle.rzp_entity_cache.Pop(key)
+
+	def WarmEntityCache(self, urls=None, filters={}):
+		""" load all entities of the cached types, or of urls, returns the count loaded """
+		cache = RazorpayHandle.rzp_entity_cache
+		if not cache:
+			return 0
+		count = 0
+		## entities written after the listing started are left out, their page may be stale
+		start = next(RazorpayHandle.rzp_entity_gen_count)
+		for url in (urls or list(RazorpayHandle.rzp_entity_ttl)):
+			ttl = RazorpayHandle.rzp_entity_ttl.get(url, 0)
+			if not ttl:
+				continue
+			for entity in self.IterAll(url, filters):
+				key = (self.username, url, entity['id'])
+				with RazorpayHandle.rzp_entity_lock:
+					if RazorpayHandle.rzp_entity_gens.Get(key, 0) < start:
+						cache.Put(key, entity, ttl=ttl)
+						count += 1
+		return count
+
+	def _SendJson(self, method, data, url, username, passwd, timeout=None, compress=None, headers=None):
+		""" send json data, drops the cached entity written to """
+		try:
+			return super()._SendJson( method, data, url, username, passwd, timeout, compress, headers)
+		finally:
+			self._DropEntity(url)
+
+	def _ErrorResponse(self, r):
+		""" log razorpay errors """
+		try:
+			logger.warning("RZP Error: {}" , r.data.decode('utf-8'))
+		except:
+			logger.warning("RZP Error: UNKNOWN")
 
-	def GetData(self, url, xdata={}):
-		""" get items as json data """
+	def _PostJsonData(self, data, url, username, passwd, post='POST'):
+		""" post file as json data """
+		return self._SendJson( post, data, url, username, passwd)
+
+	def _GetJsonData(self, url, username, passwd, fields={}):
+		""" get file as json data """
+		return self._FetchJson( url, username, passwd, fields)
+
+	def GetData(self, url, xdata={}, coalesce=None, cache=True):
+		""" get items as json data, coalesce to share one fetch among concurrent identical calls
+
+		with RegisterEntityCache plans, items, addons and customers by id come from
+		the entity cache unless cache is False, treat those results as read only
+		"""
+		if cache and not xdata:
+			key, ttl = self._EntityKey(url)
+			if key:
+				return self._GetEntity(url, key, ttl)
+		if self._Coalesce(coalesce):
+			return self._GetShared(self._FetchJson, url, self.username, self.passwd, xdata)
 		return self._GetJsonData(url, self.username, self.passwd, xdata)
 
+	async def GetDataAsync(self, url, xdata={}):
+		""" asyncio get items as json data, always coalesced """
+		return await self._GetSharedAsync(self._FetchJson, url, self.username, self.passwd, xdata)
+
 	def PostData(self, url, xdata):
 		""" post items as json data """
 		return self._PostJsonData(xdata, url, self.username, self.passwd)
@@ -149,3 +301,97 @@ class RazorpayHandle(HttpPostHandle):
 		""" patch items as json data """
 		return self._PostJsonData(xdata, f"{url}/{xtra}", self.username, self.passwd, 'PATCH')
 
+	def IterAll(self, url, filters={}, page_size=RAZORPAY_PAGE_SIZE, prefetch=RAZORPAY_PREFETCH):
+		""" yield entities across all pages, next pages fetched in background
+
+		use `from` / `to` filters to keep pages stable while paging
+		"""
+		page_size = min(page_size, RAZORPAY_PAGE_SIZE)
+		skip = int(filters.get('skip', 0))
+		pending = deque()
+		with ThreadPoolExecutor(max_workers=prefetch + 1) as pool:
+			try:
+				for _ in range(prefetch + 1):
+					pending.append((skip, pool.submit(self.GetData, url, { **filters, 'count' : page_size, 'skip' : skip })))
+					skip += page_size
+				while pending:
+					at, fut = pending.popleft()
+					page = fut.result()
+					if 'items' not in page:
+						raise ValueError("RZP IterAll: page failed at skip {}".format(at))
+					items = page['items']
+					if len(items) < page_size:
+						yield from items
+						return
+					## keep the window full while this page is consumed
+					pending.append((skip, pool.submit(self.GetData, url, { **filters, 'count' : page_size, 'skip' : skip })))
+					skip += page_size
+					yield from items
+			finally:
+				for at, fut in pending:
+					fut.cancel()
+
+	def _BatchKey(self, *parts):
+		""" stable key from the json of parts, fits a receipt, plain json so it does not change with the codec """
+		blob = json.dumps(parts, sort_keys=True, separators=(',', ':'), default=str)
+		return hashlib.sha256(blob.encode('utf-8')).hexdigest()[:RAZORPAY_RECEIPT_LEN]
+
+	def _SendMany(self, calls, max_workers):
+		""" send (method, url, key, xdata) calls concurrently, each key once, results in input order
+
+		razorpay ignores Idempotency-Key, so the key only dedups within the batch
+		and creates are never retried once they may have reached the server ; a
+		None key is always sent, repeats of a key get their own copy of the result
+		"""
+		reqs = []
+		slots = []
+		seen = {}
+		for method, url, key, xdata in calls:
+			if key is None or key not in seen:
+				if key is not None:
+					seen[key] = len(reqs)
+				slots.append(len(reqs))
+				reqs.append({ 'method' : method, 'url' : url, 'data' : xdata,
+					'username' : self.username, 'passwd' : self.passwd })
+			else:
+				slots.append(seen[key])
+		results = self.RequestMany(reqs, max_workers=max_workers, per_host=max_workers)
+		output = []
+		used = set()
+		for pos in slots:
+			output.append(copy.deepcopy(results[pos]) if pos in used else results[pos])
+			used.add(pos)
+		return output
+
+	def PostMany(self, url, items, key_field=None, batch_id='', max_workers=RAZORPAY_BATCH_WORKERS):
+		""" create many entities concurrently, results in input order, errors as error dicts
+
+		an item without `key_field` gets a hash of batch_id, its position and
+		the item as `key_field`, so identical items stay distinct and a rerun
+		of the same batch sends the same receipts ; key_field defaults to
+		`receipt` for orders and `reference_id` for payment links, other
+		entities and a blank key_field are sent as given ; only items with the
+		same given key are created once, razorpay does not enforce unique
+		receipts so check them before a rerun
+		"""
+		if key_field is None:
+			entity = urllib3.util.parse_url(url).path.rstrip('/').rsplit('/', 1)[-1]
+			key_field = RAZORPAY_BATCH_KEY_FIELD.get(entity, '')
+		calls = []
+		for pos, xdata in enumerate(items):
+			key = xdata.get(key_field) if key_field else None
+			if key:
+				key = str(key)
+			else:
+				key = None
+				if key_field:
+					xdata = { **xdata, key_field : self._BatchKey('POST', url, batch_id, pos, xdata) }
+			calls.append(('POST', url, key, xdata))
+		return self._SendMany(calls, max_workers)
+
+	def PatchMany(self, url, updates, max_workers=RAZORPAY_BATCH_WORKERS):
+		""" patch many entities concurrently from (xtra, xdata) pairs, results in input order """
+		calls = []
+		for xtra, xdata in updates:
+			calls.append(('PATCH', f"{url}/{xtra}", self._BatchKey('PATCH', url, xtra, xdata), xdata))
+		return self._SendMany(calls, max_workers)
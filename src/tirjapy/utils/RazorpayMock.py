@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+#
+# @project TirjaPy
+# @file src/tirjapy/utils/RazorpayMock.py
+# @author  Shreos Roychowdhury <shreos@tirja.com>
+# @version 1.0.0
+# 
+# @section DESCRIPTION
+# 
+#   RazorpayMock.py : local razorpay stand-in for tests and benchmarks
+# 
+# @section LICENSE
+# 
+# Copyright (c) 2025 Shreos Roychowdhury.
+# Copyright (c) 2025 Tirja Consulting LLP.
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+# 
+
+from loguru import logger
+
+import os
+import sys
+import gzip
+import json
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl
+
+try:
+	import zstandard
+except ImportError:
+	zstandard = None
+
+## id prefix by entity path, others use the path without the plural s
+MOCK_ID_PREFIX = {
+	'orders' : 'order',
+	'payment_links' : 'plink',
+	'invoices' : 'inv',
+	'payments' : 'pay',
+	'refunds' : 'rfnd',
+	'customers' : 'cust',
+	'subscriptions' : 'sub',
+	'virtual_accounts' : 'va',
+	'fund_accounts' : 'fa',
+	'accounts' : 'acc',
+}
+
+## create fields only one entity takes, razorpay rejects them elsewhere
+MOCK_ONLY_FIELDS = {
+	'receipt' : 'orders',
+	'reference_id' : 'payment_links',
+}
+
+class _MockHandler(BaseHTTPRequestHandler):
+	""" json api over the mock store """
+
+	protocol_version = 'HTTP/1.1'
+	## one write per response, split header / body writes stall on delayed acks
+	wbufsize = -1
+	disable_nagle_algorithm = True
+
+	def log_message(self, format, *args):
+		pass
+
+	def _Reply(self, status, data, headers={}):
+		body = json.dumps(data).encode('utf-8')
+		self.send_response(status)
+		self.send_header('Content-Type', 'application/json')
+		self.send_header('Content-Length', str(len(body)))
+		for name, value in headers.items():
+			self.send_header(name, value)
+		self.end_headers()
+		self.wfile.write(body)
+
+	def _Body(self):
+		size = int(self.headers.get('Content-Length', 0))
+		body = self.rfile.read(size) if size else b''
+		encoding = self.headers.get('Content-Encoding', '')
+		if encoding == 'gzip':
+			body = gzip.decompress(body)
+		elif encoding == 'zstd' and zstandard:
+			body = zstandard.ZstdDecompressor().decompress(body)
+		return json.loads(body) if body else {}
+
+	def _Handle(self, method):
+		mock = self.server.mock
+		parts = urlsplit(self.path)
+		body = self._Body() if method != 'GET' else {}
+		status, data, headers = mock.Dispatch(method, parts.path, dict(parse_qsl(parts.query)), body, self.headers)
+		self._Reply(status, data, headers)
+
+	def do_GET(self):
+		self._Handle('GET')
+
+	def do_POST(self):
+		self._Handle('POST')
+
+	def do_PATCH(self):
+		self._Handle('PATCH')
+
+	def do_PUT(self):
+		self._Handle('PUT')
+
+class RazorpayMock:
+	""" in process razorpay stand-in, create / fetch / list / patch any entity
+
+	`latency` secs is added to each call, `throttle_every` nth call gets a 429
+	with `retry_after` ; like razorpay it ignores Idempotency-Key, a repeated
+	create makes a new entity
+	"""
+
+	def __init__(self, port=0, latency=0.0, throttle_every=0, retry_after=1):
+		self.port = port
+		self.latency = latency
+		self.throttle_every = throttle_every
+		self.retry_after = retry_after
+		self.store = {}
+		self.calls = 0
+		self.throttled = 0
+		self.lock = threading.Lock()
+		self.server = None
+		self.thread = None
+
+	def Start(self):
+		""" serve in a daemon thread, returns the base url """
+		self.server = ThreadingHTTPServer(('127.0.0.1', self.port), _MockHandler)
+		self.server.daemon_threads = True
+		self.server.mock = self
+		self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+		self.thread.start()
+		return self.BaseUrl()
+
+	def Stop(self):
+		""" stop serving """
+		if self.server:
+			self.server.shutdown()
+			self.server.server_close()
+			self.server = None
+
+	def BaseUrl(self):
+		""" base url, use in place of RAZORPAY_BASE_URL """
+		return "http://127.0.0.1:{}".format(self.server.server_address[1])
+
+	def GetStats(self):
+		""" call counts and entities held """
+		with self.lock:
+			return { 'calls' : self.calls, 'throttled' : self.throttled,
+				'entities' : { name : len(rows) for name, rows in self.store.items() } }
+
+	def _Error(self, status, description):
+		return status, { 'error' : { 'code' : 'BAD_REQUEST_ERROR', 'description' : description } }, {}
+
+	def Dispatch(self, method, path, query, body, headers):
+		""" handle one call, returns status, json data, extra headers """
+		if self.latency:
+			time.sleep(self.latency)
+		with self.lock:
+			self.calls += 1
+			if self.throttle_every and self.calls % self.throttle_every == 0:
+				self.throttled += 1
+				status, data, _ = self._Error(429, 'Too many requests')
+				return status, data, { 'Retry-After' : str(self.retry_after) }
+			if not headers.get('Authorization'):
+				return self._Error(401, 'The api key provided is invalid')
+			return self._Apply(method, path.strip('/').split('/')[1:], query, body)
+
+	def _Apply(self, method, parts, query, body):
+		""" store operation, parts are the path without the api version """
+		if not parts or not parts[0]:
+			return self._Error(404, 'The requested URL was not found on the server')
+		## trailing part is an id when it is held under the parent path
+		name = '/'.join(parts[:-1])
+		if len(parts) > 1 and parts[-1] in self.store.get(name, {}):
+			rows = self.store[name]
+			if method == 'GET':
+				return 200, rows[parts[-1]], {}
+			if method in ('PATCH', 'PUT'):
+				rows[parts[-1]].update(body)
+				return 200, rows[parts[-1]], {}
+			return self._Error(400, 'The requested URL was not found on the server')
+		if len(parts) > 1 and name in self.store and method != 'POST':
+			return self._Error(400, 'The id provided does not exist')
+
+		name = '/'.join(parts)
+		rows = self.store.setdefault(name, OrderedDict())
+		if method == 'GET':
+			count = int(query.get('count', 10))
+			skip = int(query.get('skip', 0))
+			items = list(reversed(rows.values()))[skip:skip + count]
+			return 200, { 'entity' : 'collection', 'count' : len(items), 'items' : items }, {}
+		if method == 'POST':
+			plural = parts[-1]
+			for field, only in MOCK_ONLY_FIELDS.items():
+				if field in body and plural != only:
+					return self._Error(400, "{} is/are not required and should not be sent".format(field))
+			prefix = MOCK_ID_PREFIX.get(plural, plural.rstrip('s'))
+			entity = { 'id' : "{}_{}".format(prefix, uuid.uuid4().hex[:14]), 'entity' : plural.rstrip('s'),
+				**body, 'created_at' : int(time.time()) }
+			if plural == 'orders':
+				entity.setdefault('status', 'created')
+			rows[entity['id']] = entity
+			return 200, entity, {}
+		return self._Error(400, 'The id provided does not exist')
+
+def _Bench(count, workers, latency):
+	""" sequential PostData against PostMany on the mock """
+	from tirjapy.utils.RazorpayHandle import RazorpayHandle
+
+	os.environ.setdefault('RAZORPAY_KEY_ID', 'rzp_test_mock')
+	os.environ.setdefault('RAZORPAY_KEY_SECRET', 'mock')
+	mock = RazorpayMock(latency=latency)
+	url = mock.Start() + '/v1/orders'
+	handle = RazorpayHandle()
+	items = [ { 'amount' : 100 * (i + 1), 'currency' : 'INR' } for i in range(count) ]
+	try:
+		start = time.perf_counter()
+		for item in items:
+			handle.PostData(url, item)
+		single = time.perf_counter() - start
+		start = time.perf_counter()
+		handle.PostMany(url, items, max_workers=workers)
+		batch = time.perf_counter() - start
+		logger.info("RZP mock {} orders : PostData {:.2f}s, PostMany x{} {:.2f}s", count, single, workers, batch)
+		logger.info("RZP mock stats : {}", mock.GetStats())
+	finally:
+		mock.Stop()
+
+if __name__ == '__main__':
+	## python -m tirjapy.utils.RazorpayMock [count] [workers] [latency secs]
+	args = sys.argv[1:]
+	_Bench(int(args[0]) if len(args) > 0 else 500, int(args[1]) if len(args) > 1 else 8,
+		float(args[2]) if len(args) > 2 else 0.01)
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+#
+# @project TirjaPy
+# @file src/tirjapy/utils/RazorpayWebhook.py
+# @author  Shreos Roychowdhury <shreos@tirja.com>
+# @version 1.0.0
+# 
+# @section DESCRIPTION
+# 
+#   RazorpayWebhook.py : razorpay webhook verify, dedup and dispatch
+# 
+# @section LICENSE
+# 
+# Copyright (c) 2025 Shreos Roychowdhury.
+# Copyright (c) 2025 Tirja Consulting LLP.
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+# 
+
+from loguru import logger
+
+import os
+import hmac
+import queue
+import hashlib
+import threading
+from collections import deque
+
+from tirjapy.utils import JsonCodec
+from tirjapy.utils.LruCache import LruCache
+
+RAZORPAY_SIGNATURE_HEADER           = 'X-Razorpay-Signature'
+RAZORPAY_EVENT_ID_HEADER            = 'X-Razorpay-Event-Id'
+
+RAZORPAY_WEBHOOK_SEEN               = 100000      # event ids held for dedup
+RAZORPAY_WEBHOOK_SEEN_TTL           = 86400       # secs an event id is held, razorpay retries for a day
+RAZORPAY_WEBHOOK_QUEUE              = 1000        # events waiting for the workers
+RAZORPAY_WEBHOOK_FAILED             = 1000        # failed queued events held for ReplayFailed
+
+class RazorpayWebhook:
+	""" verify, dedup and dispatch razorpay webhook deliveries
+
+	Handle(body, headers) returns (status, data) for the http response ;
+	with workers > 0 events are queued and handled in the background, so
+	the response does not wait on the handler ; a queued event is already
+	acknowledged, razorpay will not redeliver it if the handler fails, such
+	events are kept for GetFailed / ReplayFailed ; without workers an event
+	id is seen only once its handler succeeds, a redelivery while the first
+	attempt runs gets a 409 so razorpay sends it again
+	"""
+
+	def __init__(self, handler, secret=None, workers=0, seen_size=RAZORPAY_WEBHOOK_SEEN,
+			seen_ttl=RAZORPAY_WEBHOOK_SEEN_TTL, queue_size=RAZORPAY_WEBHOOK_QUEUE, failed_size=RAZORPAY_WEBHOOK_FAILED):
+		""" handler(event) is called once per event id, secret defaults to RAZORPAY_WEBHOOK_SECRET """
+		if secret is None:
+			secret = os.environ["RAZORPAY_WEBHOOK_SECRET"]
+		## keyed once, copied per delivery
+		self.mac = hmac.new(secret.encode('utf-8'), digestmod=hashlib.sha256)
+		self.handler = handler
+		self.seen = LruCache(seen_size, seen_ttl)
+		self.stats = { 'received' : 0, 'invalid' : 0, 'duplicate' : 0, 'in_flight' : 0, 'handled' : 0, 'failed' : 0, 'rejected' : 0 }
+		self.lock = threading.Lock()
+		## event ids whose first attempt is running, under lock
+		self.in_flight = set()
+		self.failed = deque(maxlen=failed_size)
+		self.queue = None
+		self.workers = []
+		if workers > 0:
+			self.queue = queue.Queue(queue_size)
+			for _ in range(workers):
+				worker = threading.Thread(target=self._Worker, daemon=True)
+				worker.start()
+				self.workers.append(worker)
+
+	def _Count(self, name):
+		with self.lock:
+			self.stats[name] += 1
+
+	def _Header(self, headers, name):
+		""" header from a case insensitive mapping or a plain dict """
+		value = headers.get(name)
+		if value is None:
+			value = headers.get(name.lower())
+		return value
+
+	def Verify(self, body, signature):
+		""" constant time check of the hex hmac sha256 of the raw body """
+		if not signature:
+			return False
+		if isinstance(body, str):
+			body = body.encode('utf-8')
+		if isinstance(signature, str):
+			## compare_digest rejects non ascii str
+			signature = signature.encode('utf-8', 'replace')
+		mac = self.mac.copy()
+		mac.update(body)
+		return hmac.compare_digest(mac.hexdigest().encode('ascii'), signature.strip())
+
+	def Handle(self, body, headers):
+		""" process one delivery, returns (status, data) """
+		self._Count('received')
+		if isinstance(body, str):
+			body = body.encode('utf-8')
+		if not self.Verify(body, self._Header(headers, RAZORPAY_SIGNATURE_HEADER)):
+			self._Count('invalid')
+			return 400, { 'status' : 'invalid signature' }
+
+		event_id = self._Header(headers, RAZORPAY_EVENT_ID_HEADER) or hashlib.sha256(body).hexdigest()
+		with self.lock:
+			if self.seen.Get(event_id):
+				status = 'duplicate'
+			elif event_id in self.in_flight:
+				status = 'in_flight'
+			else:
+				status = None
+				self.in_flight.add(event_id)
+			if status:
+				self.stats[status] += 1
+		if status == 'duplicate':
+			return 200, { 'status' : 'duplicate' }
+		if status:
+			return 409, { 'status' : 'in progress' }
+
+		try:
+			try:
+				event = JsonCodec.loads(body)
+			except ValueError:
+				self._Count('invalid')
+				return 400, { 'status' : 'invalid body' }
+
+			if self.queue is not None:
+				## acknowledged once queued, a redelivery is a duplicate
+				self.seen.Put(event_id, True)
+				try:
+					self.queue.put_nowait((event_id, event))
+				except queue.Full:
+					## forget it so the redelivery is taken
+					self.seen.Pop(event_id)
+					self._Count('rejected')
+					return 503, { 'status' : 'busy' }
+				return 200, { 'status' : 'queued' }
+
+			if not self._Dispatch(event_id, event):
+				return 500, { 'status' : 'failed' }
+			return 200, { 'status' : 'handled' }
+		finally:
+			with self.lock:
+				self.in_flight.discard(event_id)
+
+	def _Dispatch(self, event_id, event):
+		""" run the handler, the event id is seen once it succeeds and forgotten if it fails """
+		try:
+			self.handler(event)
+		except Exception as err:
+			logger.warning("RZP webhook {} failed: {}", event_id, err)
+			self.seen.Pop(event_id)
+			self._Count('failed')
+			return False
+		self.seen.Put(event_id, True)
+		self._Count('handled')
+		return True
+
+	def _Worker(self):
+		""" drain the event queue until a None, failed events are kept as they were acknowledged """
+		while True:
+			item = self.queue.get()
+			try:
+				if item is None:
+					return
+				if not self._Dispatch(*item):
+					logger.error("RZP webhook {} failed after ack, kept for ReplayFailed", item[0])
+					with self.lock:
+						self.failed.append(item)
+			finally:
+				self.queue.task_done()
+
+	def GetFailed(self):
+		""" (event_id, event) of queued events whose handler failed, oldest first """
+		with self.lock:
+			return list(self.failed)
+
+	def ReplayFailed(self):
+		""" run the handler again on failed queued events, returns the count handled """
+		with self.lock:
+			items = list(self.failed)
+			self.failed.clear()
+		handled = 0
+		for event_id, event in items:
+			if self._Dispatch(event_id, event):
+				handled += 1
+			else:
+				with self.lock:
+					self.failed.append((event_id, event))
+		return handled
+
+	def Join(self):
+		""" wait until queued events are handled """
+		if self.queue is not None:
+			self.queue.join()
+
+	def Stop(self):
+		""" handle what is queued, then stop the workers """
+		if self.queue is not None:
+			for _ in self.workers:
+				self.queue.put(None)
+			for worker in self.workers:
+				worker.join()
+			self.workers = []
+
+	def GetStats(self):
+		""" delivery counts, queue depth and dedup cache stats """
+		with self.lock:
+			stats = dict(self.stats)
+			stats['kept'] = len(self.failed)
+		stats['queued'] = self.queue.qsize() if self.queue is not None else 0
+		stats['seen'] = self.seen.GetStats()
+		return stats
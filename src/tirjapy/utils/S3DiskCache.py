@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+#
+# @project TirjaPy
+# @file src/tirjapy/utils/S3DiskCache.py
+# @author  Shreos Roychowdhury <shreos@tirja.com>
+# @version 1.0.0
+# 
+# @section DESCRIPTION
+# 
+#   S3DiskCache.py : local lru disk cache of s3 objects
+# 
+# @section LICENSE
+# 
+# Copyright (c) 2025 Shreos Roychowdhury.
+# Copyright (c) 2025 Tirja Consulting LLP.
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+# 
+
+import os
+import shutil
+import hashlib
+import time
+import tempfile
+import threading
+from collections import OrderedDict
+
+from tirjapy.utils.SingleFlight import SingleFlight
+
+PART_SUFFIX = '.part'
+
+class S3DiskCache:
+	""" thread safe lru disk cache of s3 objects by bucket, key and etag
+
+	entries are written to a temp file and renamed in, so a reader never
+	sees a partial file ; a new etag is a new entry, the old one ages out.
+	entries are read only and copied out, with link they are hardlinked
+	out instead, the placed file is then read only too and keeps its bytes
+	on disk after eviction, so quota counts the cache dir only
+	"""
+
+	def __init__(self, root, quota, link=False):
+		""" quota in bytes, entries found in root are kept, oldest access first """
+		self.root = root
+		self.quota = quota
+		self.link = link
+		self.lock = threading.Lock()
+		self.flights = SingleFlight()
+		self.entries = OrderedDict()
+		self.used = 0
+		self.stats = { 'hits' : 0, 'misses' : 0, 'evicted' : 0 }
+		os.makedirs(root, exist_ok=True)
+		self._Load()
+
+	def _Load(self):
+		""" index entries on disk, drop stale temp files """
+		found = []
+		for dirpath, dirs, files in os.walk(self.root):
+			for name in files:
+				path = os.path.join(dirpath, name)
+				if name.endswith(PART_SUFFIX):
+					self._Remove(path)
+					continue
+				stat = os.stat(path)
+				found.append((stat.st_atime, path, stat.st_size))
+		for atime, path, size in sorted(found):
+			self.entries[path] = size
+			self.used += size
+		self._Evict()
+
+	def _Path(self, bucket, key, etag):
+		""" entry path, two level fan out """
+		name = hashlib.sha256('\0'.join([bucket, key, etag.strip('"')]).encode('utf-8')).hexdigest()
+		return os.path.join(self.root, name[:2], name)
+
+	def _Remove(self, path):
+		try:
+			os.unlink(path)
+		except FileNotFoundError:
+			pass
+
+	def _Evict(self, keep=None):
+		""" drop least recently used entries over quota, caller may hold the lock """
+		while self.used > self.quota and self.entries:
+			path, size = next(iter(self.entries.items()))
+			if path == keep and len(self.entries) == 1:
+				return
+			if path == keep:
+				self.entries.move_to_end(path)
+				continue
+			del self.entries[path]
+			self.used -= size
+			self.stats['evicted'] += 1
+			self._Remove(path)
+
+	def Lookup(self, bucket, key, etag):
+		""" entry path if cached, marks it recently used """
+		path = self._Path(bucket, key, etag)
+		with self.lock:
+			if path not in self.entries:
+				return None
+			self.entries.move_to_end(path)
+		## keeps lru order across restarts, mtime is left as a linked copy shares it
+		try:
+			os.utime(path, ns=(time.time_ns(), os.stat(path).st_mtime_ns))
+		except FileNotFoundError:
+			with self.lock:
+				self.used -= self.entries.pop(path, 0)
+			return None
+		return path
+
+	def _Fill(self, path, download):
+		""" download into a temp file in the cache and rename it in """
+		os.makedirs(os.path.dirname(path), exist_ok=True)
+		fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=PART_SUFFIX)
+		os.close(fd)
+		try:
+			download(tmp)
+			## a writer to a linked copy must not change the entry
+			os.chmod(tmp, 0o444)
+			os.replace(tmp, path)
+		except:
+			self._Remove(tmp)
+			raise
+		size = os.path.getsize(path)
+		with self.lock:
+			self.used += size - self.entries.get(path, 0)
+			self.entries[path] = size
+			self.entries.move_to_end(path)
+			self._Evict(keep=path)
+		return path
+
+	def Fetch(self, bucket, key, etag, download):
+		""" entry path, on a miss download(tmp_path) fills it once for all concurrent callers """
+		path = self.Lookup(bucket, key, etag)
+		with self.lock:
+			self.stats['hits' if path else 'misses'] += 1
+		if path:
+			return path
+		path = self._Path(bucket, key, etag)
+		return self.flights.Do(path, self._Fill, path, download)
+
+	def LinkTo(self, path, dest):
+		""" place an entry at dest, a copy or with link a hardlink, replaces dest atomically """
+		os.makedirs(os.path.dirname(dest) or '.', exist_ok=True)
+		fd, tmp = tempfile.mkstemp(dir=os.path.dirname(dest) or '.', suffix=PART_SUFFIX)
+		os.close(fd)
+		os.unlink(tmp)
+		try:
+			linked = False
+			if self.link:
+				try:
+					os.link(path, tmp)
+					linked = True
+				except OSError:
+					## other device or no hardlinks
+					pass
+			if not linked:
+				shutil.copyfile(path, tmp)
+			os.replace(tmp, dest)
+		except:
+			self._Remove(tmp)
+			raise
+
+	def Clear(self):
+		""" remove all entries """
+		with self.lock:
+			for path in self.entries:
+				self._Remove(path)
+			self.entries.clear()
+			self.used = 0
+
+	def GetStats(self):
+		""" hit, miss and eviction counts, entries and bytes used """
+		with self.lock:
+			return { **self.stats, 'entries' : len(self.entries), 'used' : self.used, 'quota' : self.quota }
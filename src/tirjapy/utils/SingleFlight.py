@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+#
+# @project TirjaPy
+# @file src/tirjapy/utils/SingleFlight.py
+# @author  Shreos Roychowdhury <shreos@tirja.com>
+# @version 1.0.0
+# 
+# @section DESCRIPTION
+# 
+#   SingleFlight.py : coalesce concurrent identical calls
+# 
+# @section LICENSE
+# 
+# Copyright (c) 2025 Shreos Roychowdhury.
+# Copyright (c) 2025 Tirja Consulting LLP.
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+# 
+
+import asyncio
+import threading
+from concurrent.futures import Future
+
+class SingleFlight:
+	""" one in-flight call per key, concurrent callers for the key share its result """
+
+	def __init__(self):
+		""" constructor default"""
+		self.lock = threading.Lock()
+		self.calls = {}
+
+	def _Join(self, key):
+		""" get the in-flight future for key, leader if just made """
+		with self.lock:
+			fut = self.calls.get(key)
+			if fut:
+				return fut, False
+			fut = Future()
+			self.calls[key] = fut
+			return fut, True
+
+	def _Done(self, key):
+		""" later callers start a new flight """
+		with self.lock:
+			self.calls.pop(key, None)
+
+	def _Run(self, key, fut, fx, *args):
+		""" leader runs fx and publishes the result """
+		try:
+			result = fx(*args)
+		except BaseException as err:
+			self._Done(key)
+			fut.set_exception(err)
+			if not isinstance(err, Exception):
+				raise
+			return
+		self._Done(key)
+		fut.set_result(result)
+
+	def Do(self, key, fx, *args):
+		""" call fx(*args) unless already in flight for key, then wait for that """
+		fut, leader = self._Join(key)
+		if leader:
+			self._Run(key, fut, fx, *args)
+		return fut.result()
+
+	async def DoAsync(self, key, fx, *args):
+		""" asyncio Do, fx runs on the loop default executor """
+		fut, leader = self._Join(key)
+		if leader:
+			loop = asyncio.get_running_loop()
+			await loop.run_in_executor(None, self._Run, key, fut, fx, *args)
+		return await asyncio.wrap_future(fut)
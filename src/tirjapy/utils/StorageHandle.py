@@ -35,19 +35,58 @@
 from loguru import logger
 
 import os
+import io
 import sys
 import json
+import hashlib
+import threading
+import functools
+import concurrent.futures
+from concurrent.futures import ThreadPoolExecutor
 import boto3
-from boto3.s3.transfer import S3Transfer
+from boto3.s3.transfer import S3Transfer, TransferConfig
+from botocore.config import Config
+from botocore.exceptions import ClientError
 import mimetypes
 
 from tirjapy.utils.HandleQuotes import HandleQuotes
+from tirjapy.utils.S3DiskCache import S3DiskCache
+from tirjapy.base.HandleConstants import S3_MAX_POOL, S3_REPLICA_WORKERS, S3_REPLICA_QUEUE, S3_BATCH_WORKERS, \
+	S3_CACHE_QUOTA, S3_HASH_CHUNK
 
 MIME_UNKNOWN = 'application/octet-stream'
 
+## bucket2 writes in WriteFile : both at once and wait, or queued in the background
+REPLICA_PARALLEL = 'parallel'
+REPLICA_ASYNC = 'async'
+
+## object metadata holding the hex sha256 of the content, set by skip_same writes
+META_SHA256 = 'sha256'
+
+## TransferConfig fields taken from a transfer block, sizes in bytes
+TRANSFER_FIELDS = {
+	'multipart_threshold' : int,
+	'multipart_chunksize' : int,
+	'max_concurrency' : int,
+	'max_io_queue' : int,
+	'io_chunksize' : int,
+	'num_download_attempts' : int,
+	'max_bandwidth' : int,
+	'use_threads' : bool,
+}
+
 class StorageHandle(HandleQuotes):
 
 	s3_creds = None
+	s3_clients = {}
+	s3_transfers = {}
+	s3_lock = threading.Lock()
+	s3_replicator = None
+	s3_parallel = None
+	s3_replica_slots = None
+	s3_replicas = set()
+	s3_replica_stats = { 'queued' : 0, 'done' : 0, 'failed' : 0 }
+	s3_disk_cache = None
 
 	def __init__(self):
 		""" constructor default"""
@@ -70,7 +109,21 @@ class StorageHandle(HandleQuotes):
 			raise ValueError("local_path not set")
 
 	def RegisterGlobals(self, params):
-		"""Register Global fx"""
+		"""Register Global fx
+
+		with bucket2, `replica` is parallel or async for WriteFile, and
+		`replica_copy` writes bucket2 by server side copy from bucket ;
+		`transfer` takes TransferConfig fields, e.g. multipart_chunksize
+		and max_concurrency, max_pool is at least max_concurrency ;
+		`cache_dir` turns on the disk cache for reads, up to `cache_quota` bytes,
+		`cache_link` hardlinks cached files out instead of copying, read only ;
+		`skip_same` is the default for skipping uploads of unchanged content
+		"""
+		replica = self._OptionalField( params , 'replica' , REPLICA_PARALLEL)
+		if replica not in (REPLICA_PARALLEL, REPLICA_ASYNC):
+			raise ValueError("Bad replica mode: " + str(replica))
+		transfer = self._TransferConf( self._OptionalObject( params , 'transfer' ) )
+		max_pool = max(S3_MAX_POOL, transfer.get('max_concurrency', 0))
 
 		StorageHandle.s3_creds = {
 			'access_key' : self._RequiredField( params , 'access_key' ),
@@ -80,30 +133,85 @@ class StorageHandle(HandleQuotes):
 			'bucket2' : self._OptionalField( params , 'bucket2' ),
 			'region2' : self._OptionalField( params , 'region2' ),
 			'format' : self._OptionalField( params , 'format' , 'json'),
+			'max_pool' : self._OptionalInteger( params , 'max_pool' , max_pool),
+			'transfer' : transfer,
+			'replica' : replica,
+			'replica_copy' : self._OptionalBool( params , 'replica_copy' , False),
+			'skip_same' : self._OptionalBool( params , 'skip_same' , False),
 		}
+		## clients of old creds are not reused
+		with StorageHandle.s3_lock:
+			StorageHandle.s3_clients = {}
+			StorageHandle.s3_transfers = {}
+		cache_dir = self._OptionalField( params , 'cache_dir' )
+		StorageHandle.s3_disk_cache = S3DiskCache(cache_dir,
+			self._OptionalInteger( params , 'cache_quota' , S3_CACHE_QUOTA),
+			self._OptionalBool( params , 'cache_link' , False)) if cache_dir else None
 		self._Initialize()
+		if self.has_two_buckets:
+			logger.info("S3 Storage : configured two bucket")
+
+	def _TransferConf(self, params):
+		""" TransferConfig kwargs from a transfer block """
+		conf = {}
+		for field, value in params.items():
+			if field not in TRANSFER_FIELDS:
+				raise ValueError("Bad transfer field: " + field)
+			conf[field] = TRANSFER_FIELDS[field](value)
+		return conf
+
+	def _GetClient(self, region):
+		""" process wide (client, transfer) by region, creds and registered transfer conf, both are thread safe """
+		creds = StorageHandle.s3_creds
+		conf = creds['transfer']
+		key = (region, creds['access_key'], creds['secret_key'], creds['max_pool'])
+		tkey = key + tuple(sorted(conf.items()))
+		entry = StorageHandle.s3_transfers.get(tkey)
+		if entry:
+			return entry
+		with StorageHandle.s3_lock:
+			entry = StorageHandle.s3_transfers.get(tkey)
+			if not entry:
+				client = StorageHandle.s3_clients.get(key)
+				if not client:
+					client = boto3.client('s3', region,
+						aws_access_key_id=creds['access_key'],
+						aws_secret_access_key=creds['secret_key'],
+						config=Config(max_pool_connections=creds['max_pool'])
+					)
+					StorageHandle.s3_clients[key] = client
+				entry = ( client, S3Transfer( client, TransferConfig(**conf) ) )
+				StorageHandle.s3_transfers[tkey] = entry
+		return entry
+
+	def _Upload(self, loc, bucket, rem, extra_args, transfer, callback):
+		""" upload on the shared S3Transfer, per call transfer fields get a transfer of their own for the call """
+		if not transfer:
+			self.transfer.upload_file(loc, bucket, rem, callback=callback, extra_args=extra_args)
+			return
+		## not cached, each S3Transfer holds a thread pool
+		self.client.upload_file(loc, bucket, rem, ExtraArgs=extra_args, Callback=callback,
+			Config=self._TransferConfig(transfer))
+
+	def _Download(self, bucket, rem, loc, extra_args, transfer, callback):
+		""" download as _Upload """
+		if not transfer:
+			self.transfer.download_file(bucket, rem, loc, extra_args=extra_args, callback=callback)
+			return
+		self.client.download_file(bucket, rem, loc, ExtraArgs=extra_args, Callback=callback,
+			Config=self._TransferConfig(transfer))
 
 	def _Initialize(self):
 		""" Init fx"""
 		self.bucket = StorageHandle.s3_creds['bucket']
-		self.client = boto3.client('s3', StorageHandle.s3_creds['region'],
-			aws_access_key_id=StorageHandle.s3_creds['access_key'],
-			aws_secret_access_key=StorageHandle.s3_creds['secret_key']
-		)
-		self.transfer = S3Transfer( self.client )
+		self.client, self.transfer = self._GetClient( StorageHandle.s3_creds['region'] )
 
 		## set a second bucket if valid
 		self.has_two_buckets = False
 		if ( StorageHandle.s3_creds['bucket2'] and StorageHandle.s3_creds['region2'] ):
 			self.has_two_buckets = True
 			self.bucket2 = StorageHandle.s3_creds['bucket2']
-			self.transfer2 = S3Transfer(
-				boto3.client('s3', StorageHandle.s3_creds['region2'],
-					aws_access_key_id=StorageHandle.s3_creds['access_key'],
-					aws_secret_access_key=StorageHandle.s3_creds['secret_key']
-				)
-			)
-			logger.info("S3 Storage : configured two bucket")
+			self.client2, self.transfer2 = self._GetClient( StorageHandle.s3_creds['region2'] )
 		## is init
 		self.is_init = True
 
@@ -119,36 +227,340 @@ class StorageHandle(HandleQuotes):
 			raise ValueError("Bucket not set yet")
 		return self.bucket
 
-	def WriteFile(self, loc, rem, mime_type):
-		""" Writes file to S3 both bucket and if present bucket2"""
+	def _GetReplicator(self):
+		""" shared executor for bucket2 writes, made on first use """
+		if not StorageHandle.s3_replicator:
+			with StorageHandle.s3_lock:
+				if not StorageHandle.s3_replicator:
+					StorageHandle.s3_replica_slots = threading.BoundedSemaphore(S3_REPLICA_QUEUE)
+					StorageHandle.s3_replicator = ThreadPoolExecutor(max_workers=S3_REPLICA_WORKERS,
+						thread_name_prefix='s3replica')
+		return StorageHandle.s3_replicator
+
+	def _GetParallel(self):
+		""" shared executor for parallel bucket2 writes, apart from the async queue and its slots """
+		if not StorageHandle.s3_parallel:
+			with StorageHandle.s3_lock:
+				if not StorageHandle.s3_parallel:
+					StorageHandle.s3_parallel = ThreadPoolExecutor(max_workers=S3_BATCH_WORKERS,
+						thread_name_prefix='s3parallel')
+		return StorageHandle.s3_parallel
+
+	def _Replicate(self, loc, rem, extra_args):
+		""" write rem to bucket2, server side copy from bucket or upload of loc, no loc always copies """
+		if loc is None or StorageHandle.s3_creds['replica_copy']:
+			self.client2.copy({ 'Bucket' : self.bucket, 'Key' : rem }, self.bucket2, rem, SourceClient=self.client)
+		else:
+			self.transfer2.upload_file(loc, self.bucket2, rem, extra_args=extra_args)
+
+	def _SubmitReplica(self, loc, rem, extra_args):
+		""" queue a bucket2 write, waits while the queue is full """
+		pool = self._GetReplicator()
+		StorageHandle.s3_replica_slots.acquire()
+		try:
+			future = pool.submit(self._Replicate, loc, rem, extra_args)
+		except:
+			StorageHandle.s3_replica_slots.release()
+			raise
+		with StorageHandle.s3_lock:
+			StorageHandle.s3_replicas.add(future)
+			StorageHandle.s3_replica_stats['queued'] += 1
+		future.add_done_callback(functools.partial(self._ReplicaDone, rem))
+		return future
+
+	def _ReplicaDone(self, rem, future):
+		""" count and log a finished bucket2 write """
+		StorageHandle.s3_replica_slots.release()
+		err = None if future.cancelled() else future.exception()
+		with StorageHandle.s3_lock:
+			StorageHandle.s3_replicas.discard(future)
+			StorageHandle.s3_replica_stats['failed' if err else 'done'] += 1
+		if err:
+			logger.warning("S3 replica {} : FAILED {}", rem, err)
+
+	def WaitReplicas(self, timeout=None):
+		""" wait for queued bucket2 writes, returns the count still pending """
+		with StorageHandle.s3_lock:
+			pending = list(StorageHandle.s3_replicas)
+		done, not_done = concurrent.futures.wait(pending, timeout=timeout)
+		return len(not_done)
+
+	def GetReplicaStats(self):
+		""" bucket2 write counts """
+		with StorageHandle.s3_lock:
+			return { **StorageHandle.s3_replica_stats, 'pending' : len(StorageHandle.s3_replicas) }
+
+	def _FileDigest(self, path):
+		""" hex sha256 and md5 of a file in one streaming pass """
+		sha256 = hashlib.sha256()
+		md5 = hashlib.md5(usedforsecurity=False)
+		with open(path, 'rb') as fobj:
+			while True:
+				block = fobj.read(S3_HASH_CHUNK)
+				if not block:
+					break
+				sha256.update(block)
+				md5.update(block)
+		return sha256.hexdigest(), md5.hexdigest()
+
+	def _Digest(self, loc, extra_args, skip_same):
+		""" (sha256, md5) of loc if skip_same else None, records the sha256 in extra_args for the upload """
+		if skip_same is None:
+			skip_same = StorageHandle.s3_creds['skip_same']
+		if not skip_same:
+			return None
+		sha256, md5 = self._FileDigest(loc)
+		extra_args['Metadata'] = { META_SHA256 : sha256 }
+		return sha256, md5
+
+	def _SameContent(self, client, bucket, rem, digest):
+		""" True if the stored object has the digest content, by sha256 metadata or a single part etag
+
+		a missing object, or one head may not read, is not the same
+		"""
+		if not digest:
+			return False
+		sha256, md5 = digest
+		try:
+			head = client.head_object(Bucket=bucket, Key=rem)
+		except ClientError as err:
+			## 403 also for missing keys without list rights
+			if err.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound', '403', 'AccessDenied', 'Forbidden'):
+				return False
+			raise
+		## multipart etags are not an md5 of the content
+		if head.get('Metadata', {}).get(META_SHA256) == sha256 or head.get('ETag', '').strip('"') == md5:
+			logger.debug("S3 write {} : SKIPPED same content in {}", rem, bucket)
+			return True
+		return False
+
+	def WriteFile(self, loc, rem, mime_type, replica=None, transfer=None, callback=None, skip_same=None):
+		""" Writes file to S3 both bucket and if present bucket2
+
+		replica overrides the registered mode ; parallel writes both at once
+		and raises if either fails, async returns the bucket2 future right
+		after bucket is written, keep loc until it is done unless replica_copy ;
+		transfer fields and callback(bytes) apply to the bucket upload ;
+		skip_same skips each bucket that already has the content
+		"""
 		self._SanityCheck()
 		extra_args={'ContentType' : mime_type}
-		self.transfer.upload_file(loc, self.bucket, rem, extra_args=extra_args)
-		if self.has_two_buckets:
-			self.transfer2.upload_file(loc, self.bucket2, rem, extra_args=extra_args)
+		digest = self._Digest(loc, extra_args, skip_same)
+		## each bucket is checked on its own, bucket2 may lag bucket
+		write = not self._SameContent(self.client, self.bucket, rem, digest)
+		if not self.has_two_buckets or self._SameContent(self.client2, self.bucket2, rem, digest):
+			if write:
+				self._Upload(loc, self.bucket, rem, extra_args, transfer, callback)
+			return None
+		replica = replica or StorageHandle.s3_creds['replica']
+		if write and replica == REPLICA_PARALLEL and not StorageHandle.s3_creds['replica_copy']:
+			future = self._GetParallel().submit(self._Replicate, loc, rem, extra_args)
+			try:
+				self._Upload(loc, self.bucket, rem, extra_args, transfer, callback)
+			except:
+				## the bucket2 write is not left running after we return
+				if not future.cancel():
+					concurrent.futures.wait([future])
+				raise
+			future.result()
+			return None
+		## a copy needs the object in bucket first
+		if write:
+			self._Upload(loc, self.bucket, rem, extra_args, transfer, callback)
+		if replica == REPLICA_ASYNC:
+			return self._SubmitReplica(loc, rem, extra_args)
+		self._Replicate(loc, rem, extra_args)
+		return None
+
+	def _DownloadMatch(self, bucket, s3path, head, transfer, callback, savepath):
+		""" download the version of head, raise if the object changed so it is not cached wrong """
+		extra_args = {'VersionId' : head['VersionId']} if head.get('VersionId') else None
+		self._Download(bucket, s3path, savepath, extra_args, transfer, callback)
+		if not extra_args and self.client.head_object(Bucket=bucket, Key=s3path)['ETag'] != head['ETag']:
+			raise ValueError("S3 object changed while reading: " + s3path)
 
-	def ReadFile(self, bucket, s3path, savepath):
-		""" Reads file from S3 from bucket only"""
+	def _ReadCached(self, bucket, s3path, savepath, transfer, callback):
+		""" read via the disk cache, head for the etag, link the entry to savepath """
+		cache = StorageHandle.s3_disk_cache
+		head = self.client.head_object(Bucket=bucket, Key=s3path)
+		download = functools.partial(self._DownloadMatch, bucket, s3path, head, transfer, callback)
+		try:
+			try:
+				cache.LinkTo(cache.Fetch(bucket, s3path, head['ETag'], download), savepath)
+			except FileNotFoundError:
+				## evicted between fetch and link
+				cache.LinkTo(cache.Fetch(bucket, s3path, head['ETag'], download), savepath)
+		except ValueError as err:
+			logger.warning("S3 cache {} : SKIPPED {}", s3path, err)
+			self._Download(bucket, s3path, savepath, None, transfer, callback)
+
+	def GetCacheStats(self):
+		""" disk cache stats, empty if not registered """
+		cache = StorageHandle.s3_disk_cache
+		return cache.GetStats() if cache else {}
+
+	def ReadFile(self, bucket, s3path, savepath, transfer=None, callback=None, cache=True):
+		""" Reads file from S3 from bucket only, via the disk cache if registered and cache"""
 		self._SanityCheck()
 		dirname = os.path.dirname(savepath)
 		if not os.path.exists(dirname):
 				os.makedirs(dirname,exist_ok = True)
-		self.transfer.download_file(bucket, s3path, savepath)
+		if cache and StorageHandle.s3_disk_cache:
+			return self._ReadCached(bucket, s3path, savepath, transfer, callback)
+		self._Download(bucket, s3path, savepath, None, transfer, callback)
 
-	def WriteFileObj(self, data):
-		""" Writes file to S3 using FileStore Object as data"""
+	def WriteFileObj(self, data, transfer=None, callback=None, skip_same=None):
+		""" Writes file to S3 using FileStore Object as data, False if skipped as unchanged"""
 		self._SanityCheck()
 		self._ValidateDataObj(data)
 		## take mime type from extn
 		mime_type = self._GetMimeType( data.s3_path )
 		extra_args={'ContentType' : mime_type}
+		digest = self._Digest(data.local_path, extra_args, skip_same)
+		if self._SameContent(self.client, data.s3_bucket, data.s3_path, digest):
+			return False
 		## copy
-		self.transfer.upload_file(data.local_path, data.s3_bucket, data.s3_path, extra_args=extra_args)
+		self._Upload(data.local_path, data.s3_bucket, data.s3_path, extra_args, transfer, callback)
+		return True
 
-	def ReadFileObj(self, data):
-		""" Reads file from S3 using FileStore Object as data"""
+	def ReadFileObj(self, data, transfer=None, callback=None, cache=True):
+		""" Reads file from S3 using FileStore Object as data, via the disk cache if registered and cache"""
 		self._SanityCheck()
 		self._ValidateDataObj(data)
+		if cache and StorageHandle.s3_disk_cache:
+			return self._ReadCached(data.s3_bucket, data.s3_path, data.local_path, transfer, callback)
 		## copy
-		self.transfer.download_file(data.s3_bucket, data.s3_path, data.local_path)
+		self._Download(data.s3_bucket, data.s3_path, data.local_path, None, transfer, callback)
+
+	def _TransferConfig(self, transfer):
+		""" TransferConfig of the registered conf updated by the per call transfer fields """
+		return TransferConfig(**{ **StorageHandle.s3_creds['transfer'], **self._TransferConf(transfer or {}) })
+
+	def WriteStream(self, fobj, rem, mime_type=None, bucket=None, transfer=None, callback=None):
+		""" Writes a readable file like object or bytes to S3 without a local file
+
+		without bucket it goes to bucket and is replicated to bucket2 by server
+		side copy as in WriteFile, returns the bucket2 future if async ; with a
+		bucket it is written there only, as in WriteFileObj
+		"""
+		self._SanityCheck()
+		if isinstance(fobj, (bytes, bytearray, memoryview)):
+			fobj = io.BytesIO(fobj)
+		extra_args={'ContentType' : mime_type or self._GetMimeType(rem)}
+		target = bucket or self.bucket
+		self.client.upload_fileobj(fobj, target, rem, ExtraArgs=extra_args,
+			Callback=callback, Config=self._TransferConfig(transfer))
+		if bucket or not self.has_two_buckets:
+			return None
+		if StorageHandle.s3_creds['replica'] == REPLICA_ASYNC:
+			return self._SubmitReplica(None, rem, extra_args)
+		self._Replicate(None, rem, extra_args)
+		return None
+
+	def ReadToStream(self, bucket, s3path, fobj, transfer=None, callback=None):
+		""" Reads from S3 into a writable file like object, multipart ranges in parallel """
+		self._SanityCheck()
+		self.client.download_fileobj(bucket, s3path, fobj, Callback=callback, Config=self._TransferConfig(transfer))
+
+	def ReadStream(self, bucket, s3path, start=0, end=None):
+		""" Reads from S3 as a streaming body, bytes start to end inclusive if given
+
+		read(), iter_chunks() or iter_lines() on the result, close it when done
+		"""
+		self._SanityCheck()
+		kwargs = {}
+		if start or end is not None:
+			kwargs['Range'] = "bytes={}-{}".format(start, '' if end is None else end)
+		return self.client.get_object(Bucket=bucket, Key=s3path, **kwargs)['Body']
+
+	def _RunMany(self, fx, jobs, max_workers, progress):
+		""" run fx(*job) for jobs on a pool, errors in input order, None if ok """
+		errors = [None] * len(jobs)
+		if not jobs:
+			return errors
+		with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(jobs)))) as pool:
+			futures = { pool.submit(fx, *job) : pos for pos, job in enumerate(jobs) }
+			done = 0
+			for future in concurrent.futures.as_completed(futures):
+				err = future.exception()
+				if err:
+					errors[futures[future]] = err
+					logger.warning("S3 batch {} : FAILED {}", jobs[futures[future]][1], err)
+				done += 1
+				if progress:
+					progress(done, len(jobs))
+		return errors
+
+	def WriteMany(self, pairs, mime_type=None, max_workers=S3_BATCH_WORKERS, progress=None):
+		""" WriteFile for (local, remote) pairs in parallel, returns errors in input order, None if ok
+
+		mime type from the remote extn if not given, progress is called as
+		progress(done, total) from the calling thread
+		"""
+		self._SanityCheck()
+		jobs = [ (loc, rem, mime_type or self._GetMimeType(rem)) for loc, rem in pairs ]
+		return self._RunMany(self.WriteFile, jobs, max_workers, progress)
+
+	def ReadMany(self, pairs, bucket=None, max_workers=S3_BATCH_WORKERS, progress=None):
+		""" ReadFile for (remote, local) pairs in parallel from bucket, returns errors in input order, None if ok """
+		self._SanityCheck()
+		jobs = [ (bucket or self.bucket, rem, loc) for rem, loc in pairs ]
+		return self._RunMany(self.ReadFile, jobs, max_workers, progress)
+
+	def _ListObjects(self, bucket, prefix):
+		""" key : (size, last modified secs) under prefix """
+		objects = {}
+		paginator = self.client.get_paginator('list_objects_v2')
+		for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+			for obj in page.get('Contents', []):
+				objects[obj['Key']] = (obj['Size'], obj['LastModified'].timestamp())
+		return objects
+
+	def SyncDirectory(self, local_dir, prefix, upload=True, max_workers=S3_BATCH_WORKERS, progress=None):
+		""" copy files between local_dir and bucket / prefix, up or down
+
+		files are skipped if the other side has the same size and is not
+		older ; keys that would land outside local_dir are not downloaded and
+		are failed ; returns { copied, skipped, failed : { path : error } }
+		"""
+		self._SanityCheck()
+		prefix = prefix.strip('/')
+		lead = prefix + '/' if prefix else ''
+		objects = self._ListObjects(self.bucket, lead)
+		pairs = []
+		skipped = 0
+		unsafe = {}
+		if upload:
+			for root, dirs, files in os.walk(local_dir):
+				for name in files:
+					loc = os.path.join(root, name)
+					rem = lead + os.path.relpath(loc, local_dir).replace(os.sep, '/')
+					stat = os.stat(loc)
+					obj = objects.get(rem)
+					## listings have whole secs
+					if obj and obj[0] == stat.st_size and obj[1] >= int(stat.st_mtime):
+						skipped += 1
+					else:
+						pairs.append((loc, rem))
+			errors = self.WriteMany(pairs, max_workers=max_workers, progress=progress)
+		else:
+			root = os.path.realpath(local_dir)
+			for rem, (size, modified) in objects.items():
+				if rem.endswith('/'):
+					continue
+				## keys are untrusted, .. parts must not escape local_dir
+				loc = os.path.realpath(os.path.join(root, *rem[len(lead):].split('/')))
+				if os.path.commonpath([root, loc]) != root or loc == root:
+					logger.warning("S3 sync {} : SKIPPED outside {}", rem, local_dir)
+					unsafe[rem] = "key outside local_dir"
+					continue
+				if os.path.isfile(loc) and os.path.getsize(loc) == size and os.path.getmtime(loc) >= modified:
+					skipped += 1
+				else:
+					pairs.append((rem, loc))
+			errors = self.ReadMany(pairs, max_workers=max_workers, progress=progress)
 
+		failed = { pair[0] : str(err) for pair, err in zip(pairs, errors) if err }
+		copied = len(pairs) - len(failed)
+		failed.update(unsafe)
+		return { 'copied' : copied, 'skipped' : skipped, 'failed' : failed }
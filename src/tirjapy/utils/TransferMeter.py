@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+#
+# @project TirjaPy
+# @file src/tirjapy/utils/TransferMeter.py
+# @author  Shreos Roychowdhury <shreos@tirja.com>
+# @version 1.0.0
+# 
+# @section DESCRIPTION
+# 
+#   TransferMeter.py : s3 transfer progress and throughput callback
+# 
+# @section LICENSE
+# 
+# Copyright (c) 2025 Shreos Roychowdhury.
+# Copyright (c) 2025 Tirja Consulting LLP.
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+# FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+# COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+# IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+# 
+
+import time
+import threading
+
+class TransferMeter:
+	""" thread safe s3 transfer callback, counts bytes and throughput
+
+	pass as callback to StorageHandle transfers, s3transfer calls it from
+	its worker threads with the bytes moved since the last call
+	"""
+
+	def __init__(self, total=0, progress=None):
+		""" progress(done, total) is called on every update, total 0 if unknown """
+		self.total = total
+		self.progress = progress
+		self.done = 0
+		self.start = None
+		self.stop = None
+		self.lock = threading.Lock()
+
+	def __call__(self, bytes_amount):
+		now = time.perf_counter()
+		with self.lock:
+			if self.start is None:
+				self.start = now
+			self.stop = now
+			self.done += bytes_amount
+			done = self.done
+		if self.progress:
+			self.progress(done, self.total)
+
+	def Reset(self, total=0):
+		""" start over, e.g. before the next file """
+		with self.lock:
+			self.total = total
+			self.done = 0
+			self.start = None
+			self.stop = None
+
+	def GetStats(self):
+		""" bytes, secs from first to last update, MB/s """
+		with self.lock:
+			secs = (self.stop - self.start) if self.start is not None else 0.0
+			return { 'bytes' : self.done, 'total' : self.total, 'secs' : secs,
+				'mb_per_sec' : (self.done / secs / (1 << 20)) if secs > 0 else 0.0 }
@@ -0,0 +1,66 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from tirjapy.utils.HttpPostHandle import HttpPostHandle
+
+class _Handler(BaseHTTPRequestHandler):
+
+	protocol_version = 'HTTP/1.1'
+
+	def log_message(self, format, *args):
+		pass
+
+	def do_GET(self):
+		self.server.hits += 1
+		age = '0' if self.path.startswith('/stale') else '60'
+		if self.headers.get('If-None-Match') == '"v1"':
+			self.send_response(304)
+			self.send_header('Content-Length', '0')
+			self.end_headers()
+			return
+		body = json.dumps({ 'path' : self.path }).encode('utf-8')
+		self.send_response(200)
+		self.send_header('Content-Length', str(len(body)))
+		self.send_header('ETag', '"v1"')
+		self.send_header('Cache-Control', 'max-age=' + age)
+		self.end_headers()
+		self.wfile.write(body)
+
+@pytest.fixture
+def server():
+	server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+	server.daemon_threads = True
+	server.hits = 0
+	threading.Thread(target=server.serve_forever, daemon=True).start()
+	yield server
+	server.shutdown()
+	server.server_close()
+
+@pytest.fixture
+def handle():
+	handle = HttpPostHandle()
+	handle.RegisterGlobals({ 'backoff' : 0.01 })
+	return handle
+
+def _Url(server, path):
+	return "http://127.0.0.1:{}{}".format(server.server_address[1], path)
+
+def _Delta(before, after):
+	return { name : after.get(name, 0) - before.get(name, 0) for name in ('hits', 'misses', 'stale', 'revalidated') }
+
+def test_stale_lookups_count_as_misses(server, handle):
+	before = handle.GetCacheStats()
+	for _ in range(3):
+		assert handle.GetJsonData(_Url(server, '/stale'), '', '', cache=True) == { 'path' : '/stale' }
+	assert server.hits == 3
+	assert _Delta(before, handle.GetCacheStats()) == { 'hits' : 0, 'misses' : 3, 'stale' : 2, 'revalidated' : 2 }
+
+def test_fresh_lookups_count_as_hits(server, handle):
+	before = handle.GetCacheStats()
+	for _ in range(3):
+		assert handle.GetJsonData(_Url(server, '/fresh'), '', '', cache=True) == { 'path' : '/fresh' }
+	assert server.hits == 1
+	assert _Delta(before, handle.GetCacheStats()) == { 'hits' : 2, 'misses' : 1, 'stale' : 0, 'revalidated' : 0 }
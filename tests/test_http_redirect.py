@@ -0,0 +1,75 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import urllib3
+
+from tirjapy.utils.HttpPostHandle import HttpPostHandle
+
+class _Handler(BaseHTTPRequestHandler):
+
+	protocol_version = 'HTTP/1.1'
+
+	def log_message(self, format, *args):
+		pass
+
+	def _Reply(self, status, data=None, headers={}):
+		body = json.dumps(data).encode('utf-8') if data is not None else b''
+		self.send_response(status)
+		self.send_header('Content-Length', str(len(body)))
+		for name, value in headers.items():
+			self.send_header(name, value)
+		self.end_headers()
+		self.wfile.write(body)
+
+	def do_GET(self):
+		self.server.hits += 1
+		if self.path.startswith('/old'):
+			return self._Reply(302, headers={ 'Location' : '/new' })
+		if self.path.startswith('/loop'):
+			return self._Reply(302, headers={ 'Location' : '/loop' })
+		self._Reply(200, { 'path' : self.path })
+
+	def do_POST(self):
+		self.server.hits += 1
+		self.rfile.read(int(self.headers.get('Content-Length', 0)))
+		self._Reply(303, headers={ 'Location' : '/new' })
+
+@pytest.fixture
+def server():
+	server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+	server.daemon_threads = True
+	server.hits = 0
+	threading.Thread(target=server.serve_forever, daemon=True).start()
+	yield server
+	server.shutdown()
+	server.server_close()
+
+@pytest.fixture
+def handle():
+	handle = HttpPostHandle()
+	handle.RegisterGlobals({ 'backoff' : 0.01 })
+	return handle
+
+def _Url(server, path):
+	return "http://127.0.0.1:{}{}".format(server.server_address[1], path)
+
+def test_get_follows_redirect(server, handle):
+	assert handle.GetJsonData(_Url(server, '/old'), '', '') == { 'path' : '/new' }
+
+def test_post_follows_see_other(server, handle):
+	assert handle.PostJsonData({ 'a' : 1 }, _Url(server, '/form'), '', '') == { 'path' : '/new' }
+
+def test_redirect_loop_stops(server, handle):
+	result = handle.GetJsonData(_Url(server, '/loop'), '', '')
+	assert result['error'] is True
+	## first call and HTTP_REDIRECTS follows, no retries on top
+	assert server.hits == 4
+
+def test_connect_error_is_retried_then_raised(handle):
+	server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+	url = _Url(server, '/new')
+	server.server_close()
+	with pytest.raises(urllib3.exceptions.HTTPError):
+		handle.GetJsonData(url, '', '')
@@ -0,0 +1,32 @@
+import pytest
+
+from tirjapy.utils import JsonCodec
+from tirjapy.utils.HandleQuotes import HandleQuotes
+
+BIG = { 'n' : 2**70 + 1, 'm' : -2**63 - 1, 'id' : 123456789012345678901234567890, 'small' : 7 }
+
+def test_loads_keeps_big_ints():
+	assert JsonCodec.loads(JsonCodec.dumpb(BIG)) == BIG
+	assert JsonCodec.loads(JsonCodec.dumps(BIG)) == BIG
+	assert JsonCodec.loads(b'{"id": 123456789012345678901234567890}') == { 'id' : 123456789012345678901234567890 }
+
+def test_loads_plain_payloads():
+	data = { 'a' : [1, 2.5, None, True], 'b' : 'x' * 30, 'c' : 2**63 - 1, 'd' : '12345678901234567890' }
+	assert JsonCodec.loads(JsonCodec.dumpb(data)) == data
+	assert JsonCodec.loads(JsonCodec.dumps(data)) == data
+	with pytest.raises(ValueError):
+		JsonCodec.loads(b'{"a":')
+
+def test_base64_round_trip_keeps_big_ints():
+	quotes = HandleQuotes()
+	out = quotes._Base64ToJson(quotes._JsonToBase64(BIG))
+	assert out == BIG
+	assert isinstance(out['n'], int)
+
+def test_encode_dict_round_trip_keeps_big_ints():
+	pytest.importorskip('Crypto')
+	import base64
+	from tirjapy.base.WebServiceBase import WebServiceBase
+	skey = base64.b64encode(b'k' * 32).decode('ascii')
+	service = WebServiceBase.__new__(WebServiceBase)
+	assert service._DecodeDict(skey, service._EncodeDict(skey, BIG)) == BIG
@@ -0,0 +1,34 @@
+import io
+
+import pytest
+
+from tirjapy.utils import JsonStream
+
+DOC = b'{"meta":{"n":2},"items":[{"id":1,"x":2,"tags":[{"k":"a"},{"k":"b"}]},{"x":3,"id":4,"tags":[]}],"tail":{"id":9}}'
+
+@pytest.fixture(params=['fallback', 'ijson'])
+def backend(request, monkeypatch):
+	if request.param == 'ijson':
+		pytest.importorskip('ijson')
+	else:
+		monkeypatch.setattr(JsonStream, 'ijson', None)
+	return request.param
+
+def _Items(path, chunk_size=4):
+	return list(JsonStream.items(io.BytesIO(DOC), path, chunk_size=chunk_size))
+
+def test_array_items(backend):
+	assert [ item['id'] for item in _Items('items.*') ] == [1, 4]
+
+def test_key_after_star(backend):
+	assert _Items('items.*.id') == [1, 4]
+	assert _Items('items.*.x') == [2, 3]
+
+def test_nested_path(backend):
+	assert _Items('items.*.tags.*.k') == ['a', 'b']
+	assert _Items('meta.n') == [2]
+	assert _Items('tail.id') == [9]
+
+def test_missing_path(backend):
+	assert _Items('items.*.nope') == []
+	assert _Items('nope.*') == []
@@ -0,0 +1,17 @@
+import time
+
+from tirjapy.utils.RateLimiter import TokenBucket
+
+def test_zero_rate_never_waits():
+	bucket = TokenBucket(0, 1)
+	start = time.monotonic()
+	for _ in range(100):
+		bucket.Acquire()
+	assert time.monotonic() - start < 0.05
+
+def test_zero_rate_waits_out_pause():
+	bucket = TokenBucket(0, 1)
+	bucket.Pause(0.1)
+	start = time.monotonic()
+	bucket.Acquire()
+	assert time.monotonic() - start >= 0.09
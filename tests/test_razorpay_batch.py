@@ -0,0 +1,104 @@
+import os
+
+import pytest
+
+os.environ.setdefault('RAZORPAY_KEY_ID', 'rzp_test_mock')
+os.environ.setdefault('RAZORPAY_KEY_SECRET', 'mock')
+
+from tirjapy.utils import RazorpayHandle as rzp
+from tirjapy.utils.RazorpayMock import RazorpayMock
+
+@pytest.fixture
+def mock():
+	mock = RazorpayMock()
+	mock.Start()
+	yield mock
+	mock.Stop()
+
+@pytest.fixture
+def handle(monkeypatch):
+	monkeypatch.setattr(rzp, 'RAZORPAY_THROTTLE_WAIT', 0.01)
+	return rzp.RazorpayHandle()
+
+def test_post_many_keeps_input_order(mock, handle):
+	url = mock.BaseUrl() + '/v1/orders'
+	items = [ { 'amount' : 100 * (i + 1), 'currency' : 'INR', 'receipt' : "r{}".format(i) } for i in range(20) ]
+	results = handle.PostMany(url, items, max_workers=8)
+	assert [ r['receipt'] for r in results ] == [ item['receipt'] for item in items ]
+	assert [ r['amount'] for r in results ] == [ item['amount'] for item in items ]
+	assert len({ r['id'] for r in results }) == 20
+
+def test_post_many_creates_each_key_once(mock, handle):
+	url = mock.BaseUrl() + '/v1/orders'
+	items = [ { 'amount' : 100, 'receipt' : 'a' }, { 'amount' : 200, 'receipt' : 'b' },
+		{ 'amount' : 100, 'receipt' : 'a' }, { 'amount' : 300 } , { 'amount' : 300 } ]
+	results = handle.PostMany(url, items)
+	## given receipts are created once, each slot has its own copy
+	assert results[0] == results[2]
+	assert results[0] is not results[2]
+	## items without a receipt stay distinct, keyed by position
+	assert results[3]['id'] != results[4]['id']
+	assert results[3]['receipt'] == handle._BatchKey('POST', url, '', 3, items[3])
+	assert results[4]['receipt'] == handle._BatchKey('POST', url, '', 4, items[4])
+	assert mock.GetStats()['entities']['orders'] == 4
+
+def test_post_many_rerun_sends_same_receipts(mock, handle):
+	url = mock.BaseUrl() + '/v1/orders'
+	items = [ { 'amount' : 300 }, { 'amount' : 300 } ]
+	first = handle.PostMany(url, items, batch_id='run1')
+	second = handle.PostMany(url, items, batch_id='run1')
+	assert [ r['receipt'] for r in first ] == [ r['receipt'] for r in second ]
+	assert first[0]['receipt'] != first[1]['receipt']
+	other = handle.PostMany(url, items, batch_id='run2')
+	assert other[0]['receipt'] != first[0]['receipt']
+
+def test_post_many_payment_links_use_reference_id(mock, handle):
+	url = mock.BaseUrl() + '/v1/payment_links'
+	items = [ { 'amount' : 500, 'currency' : 'INR' }, { 'amount' : 500, 'currency' : 'INR' },
+		{ 'amount' : 700, 'currency' : 'INR', 'reference_id' : 'ref7' } ]
+	results = handle.PostMany(url, items)
+	assert all('error' not in r for r in results)
+	assert 'receipt' not in results[0]
+	assert results[0]['reference_id'] == handle._BatchKey('POST', url, '', 0, items[0])
+	assert results[1]['reference_id'] == handle._BatchKey('POST', url, '', 1, items[1])
+	assert results[0]['id'] != results[1]['id']
+	assert results[2]['reference_id'] == 'ref7'
+	assert mock.GetStats()['entities']['payment_links'] == 3
+
+def test_post_many_sends_other_entities_unchanged(mock, handle):
+	url = mock.BaseUrl() + '/v1/customers'
+	items = [ { 'name' : 'a', 'email' : 'a@x.in' }, { 'name' : 'b' }, { 'name' : 'a', 'email' : 'a@x.in' } ]
+	results = handle.PostMany(url, items)
+	assert all('error' not in r for r in results)
+	assert [ set(r) - { 'id', 'entity', 'created_at' } for r in results ] == [ set(item) for item in items ]
+	assert results[0]['id'] != results[2]['id']
+	assert mock.GetStats()['entities']['customers'] == 3
+
+def test_patch_many_returns_error_dicts(mock, handle):
+	url = mock.BaseUrl() + '/v1/orders'
+	order = handle.PostData(url, { 'amount' : 100 })
+	results = handle.PatchMany(url, [ ('order_missing', { 'notes' : { 'a' : 1 } }), (order['id'], { 'notes' : { 'a' : 2 } }) ])
+	assert results[0]['error'] is True
+	assert results[1]['id'] == order['id']
+	assert results[1]['notes'] == { 'a' : 2 }
+
+def test_post_many_waits_out_429(mock, handle):
+	mock.throttle_every = 3
+	mock.retry_after = 0
+	url = mock.BaseUrl() + '/v1/orders'
+	items = [ { 'amount' : 100 * (i + 1) } for i in range(10) ]
+	results = handle.PostMany(url, items, max_workers=1)
+	assert all('error' not in r for r in results)
+	stats = mock.GetStats()
+	assert stats['throttled'] > 0
+	## a throttled create is not made twice
+	assert stats['entities']['orders'] == 10
+
+def test_429_backs_off_in_one_place(mock, handle, monkeypatch):
+	monkeypatch.setattr(rzp, 'RAZORPAY_THROTTLE_RETRIES', 1)
+	mock.throttle_every = 1
+	mock.retry_after = 0
+	result = handle.GetData(mock.BaseUrl() + '/v1/orders')
+	assert result['error'] is True
+	## one call and one throttle retry, none from the base retries
+	assert mock.GetStats()['calls'] == 2
@@ -0,0 +1,57 @@
+import hmac
+import threading
+import hashlib
+
+from tirjapy.utils.RazorpayWebhook import RazorpayWebhook
+
+SECRET = 'whsec'
+BODY = b'{"event":"payment.captured","payload":{}}'
+
+def _Sign(body):
+	return hmac.new(SECRET.encode('utf-8'), body, hashlib.sha256).hexdigest()
+
+def test_valid_signature_is_handled():
+	events = []
+	hook = RazorpayWebhook(events.append, secret=SECRET)
+	status, _ = hook.Handle(BODY, { 'X-Razorpay-Signature' : _Sign(BODY) })
+	assert status == 200
+	assert events == [ { 'event' : 'payment.captured', 'payload' : {} } ]
+
+def test_non_ascii_signature_is_rejected():
+	events = []
+	hook = RazorpayWebhook(events.append, secret=SECRET)
+	assert not hook.Verify(BODY, _Sign(BODY)[:-1] + 'é')
+	status, data = hook.Handle(BODY, { 'X-Razorpay-Signature' : '☃' * 64 })
+	assert status == 400
+	assert data == { 'status' : 'invalid signature' }
+	assert events == []
+	assert hook.stats['invalid'] == 1
+
+def test_redelivery_during_slow_handler_is_not_acknowledged():
+	started = threading.Event()
+	release = threading.Event()
+	calls = []
+	def handler(event):
+		calls.append(event)
+		started.set()
+		release.wait(5)
+		if len(calls) == 1:
+			raise ValueError('first attempt fails')
+	hook = RazorpayWebhook(handler, secret=SECRET)
+	headers = { 'X-Razorpay-Signature' : _Sign(BODY), 'X-Razorpay-Event-Id' : 'evt_1' }
+	first = []
+	worker = threading.Thread(target=lambda: first.append(hook.Handle(BODY, headers)))
+	worker.start()
+	assert started.wait(5)
+	## razorpay timed out on the first attempt and redelivers
+	status, data = hook.Handle(BODY, headers)
+	assert status == 409
+	assert data == { 'status' : 'in progress' }
+	release.set()
+	worker.join()
+	assert first[0][0] == 500
+	## the failed first attempt was not acknowledged, the next redelivery is handled
+	assert hook.Handle(BODY, headers)[0] == 200
+	assert len(calls) == 2
+	assert hook.Handle(BODY, headers) == (200, { 'status' : 'duplicate' })
+	assert hook.GetStats()['in_flight'] == 1